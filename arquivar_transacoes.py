@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Script para arquivar meses fechados do razão em partições mensais
+
+Uso:
+    python arquivar_transacoes.py                  # arquiva os meses fora da janela de retenção
+    python arquivar_transacoes.py --mes 2025-08    # arquiva um mês específico
+    python arquivar_transacoes.py --listar         # lista as partições arquivadas
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+from datetime import datetime
+
+from src.main import app
+from src.services.arquivo_transacoes import arquivo_transacoes
+
+def main():
+    parser = argparse.ArgumentParser(description='Arquivamento do razão em partições mensais')
+    parser.add_argument('--mes', help='mês a arquivar (AAAA-MM), mesmo dentro da janela de retenção')
+    parser.add_argument('--listar', action='store_true', help='listar as partições arquivadas')
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.listar:
+            for particao in arquivo_transacoes.particoes():
+                print(f"{particao.mes}: {particao.total_transacoes} transações em {particao.arquivo}")
+            return 0
+
+        indexadas = arquivo_transacoes.indexar_particoes()
+        if indexadas:
+            print(f"Índice de códigos preenchido para {indexadas} transações já arquivadas")
+
+        if args.mes:
+            meses = [datetime.strptime(args.mes, '%Y-%m')]
+        else:
+            meses = arquivo_transacoes.meses_arquivaveis()
+
+        if not meses:
+            print("Nenhum mês para arquivar.")
+            return 0
+
+        for inicio in meses:
+            movidas = arquivo_transacoes.arquivar_mes(inicio)
+            print(f"✅ {inicio.strftime('%Y-%m')}: {movidas} transações arquivadas")
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
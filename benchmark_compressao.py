@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark do custo de CPU versus bytes economizados na compressão de extratos
+
+Gera payloads no formato de resposta de `GET /api/extrato/<id>` e mede, para
+cada nível de gzip (e de brotli, se instalado), o tempo de compressão e o
+tamanho resultante.
+
+Uso:
+    python benchmark_compressao.py
+    python benchmark_compressao.py --transacoes 10 100 1000 --repeticoes 50
+"""
+
+import argparse
+import gzip
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DESCRICOES = [
+    'Pagamento de serviços', 'Transferência para investimento', 'Pagamento de aluguel',
+    'Pagamento de fornecedor - VALOR ALTO', 'Reembolso de despesas', 'Divisão de conta',
+    'Pagamento de consultoria', 'Depósito em conta', 'Pagamento de freelance'
+]
+
+def gerar_extrato(quantidade, semente=42):
+    """Payload de extrato com `quantidade` transações, como o endpoint devolve"""
+    aleatorio = random.Random(semente)
+    agora = datetime(2025, 9, 26, 12, 0, 0)
+    transacoes = []
+    for i in range(quantidade):
+        entrada = aleatorio.random() < 0.5
+        valor = round(aleatorio.uniform(10, 9000), 2)
+        transacoes.append({
+            'id': 100000 - i,
+            'codigo_unico': str(uuid.UUID(int=aleatorio.getrandbits(128))),
+            'conta_origem_id': aleatorio.randint(2, 5000) if entrada else 1,
+            'conta_destino_id': 1 if entrada else aleatorio.randint(2, 5000),
+            'tipo': 'transferencia',
+            'valor': valor,
+            'descricao': aleatorio.choice(DESCRICOES),
+            'data_transacao': (agora - timedelta(minutes=37 * i)).isoformat(),
+            'status': 'concluida',
+            'tipo_movimento': 'entrada' if entrada else 'saida',
+            'conta_relacionada': f'{aleatorio.randint(2, 5000):06d}',
+            'valor_alto': valor > 5000.0
+        })
+    return json.dumps({
+        'conta': {
+            'id': 1, 'numero_conta': '000001', 'titular': 'Maria Silva Santos', 'cpf': '12345678901',
+            'saldo': 15000.0, 'data_criacao': '2025-08-26T15:18:24.601316', 'ativo': True
+        },
+        'saldo_atual': 15000.0,
+        'transacoes': transacoes,
+        'total_transacoes': len(transacoes),
+        'periodo': {'data_inicio': None, 'data_fim': None}
+    }).encode('utf-8')
+
+def medir(funcao, dados, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao(dados)
+    return (time.perf_counter() - inicio) / repeticoes, len(resultado)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de compressão de extratos')
+    parser.add_argument('--transacoes', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--repeticoes', type=int, default=20)
+    args = parser.parse_args()
+
+    algoritmos = [(f'gzip-{nivel}', lambda d, n=nivel: gzip.compress(d, compresslevel=n, mtime=0)) for nivel in (1, 3, 6, 9)]
+    if brotli is not None:
+        algoritmos += [(f'br-{nivel}', lambda d, n=nivel: brotli.compress(d, quality=n)) for nivel in (1, 4, 6, 11)]
+    else:
+        print("(pacote brotli não instalado: medindo apenas gzip)\n")
+
+    for quantidade in args.transacoes:
+        dados = gerar_extrato(quantidade)
+        print(f"Extrato com {quantidade} transações: {len(dados):,} bytes")
+        print(f"  {'algoritmo':<10} {'bytes':>10} {'razão':>7} {'ms':>9} {'MB/s':>8}")
+        for nome, funcao in algoritmos:
+            segundos, tamanho = medir(funcao, dados, args.repeticoes)
+            print(f"  {nome:<10} {tamanho:>10,} {len(dados) / tamanho:>6.1f}x "
+                  f"{segundos * 1000:>9.3f} {len(dados) / segundos / 1e6:>8.1f}")
+        print()
+
+if __name__ == '__main__':
+    main()
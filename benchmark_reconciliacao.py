@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark da reconciliação do razão em um banco sintético
+
+Gera um banco SQLite temporário com `--transacoes` transferências e depósitos
+entre `--contas` contas, com saldos coerentes, e mede:
+
+- a reconciliação completa (todas as contas);
+- uma reconciliação incremental depois de movimentar `--tocadas` contas
+  espalhadas por toda a faixa de IDs.
+
+Serve para conferir se um razão de 10 milhões de linhas cabe na janela de
+manutenção noturna na máquina em que o script roda.
+
+Uso:
+    python benchmark_reconciliacao.py
+    python benchmark_reconciliacao.py --transacoes 1000000 --contas 50000 --processos 4
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from types import SimpleNamespace
+
+def gerar_banco(caminho, transacoes, contas, semente=42):
+    """Criar o esquema da aplicação e popular o razão sintético; devolve o maior id de transação"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{caminho}'
+    from src.main import app  # noqa: F401  (cria as tabelas e registra o modo de dinheiro)
+    from src.models.dinheiro import DINHEIRO_EM_CENTAVOS
+
+    aleatorio = random.Random(semente)
+    saldos = [0] * (contas + 1)
+    valor_banco = (lambda centavos: centavos) if DINHEIRO_EM_CENTAVOS else (lambda centavos: centavos / 100)
+
+    def linhas():
+        for i in range(1, transacoes + 1):
+            centavos = aleatorio.randint(1, 500000)
+            origem = aleatorio.randint(1, contas)
+            destino = aleatorio.randint(1, contas)
+            # Um depósito a cada dez linhas mantém as contas com saldo para as transferências
+            if i % 10 == 1 or origem == destino or saldos[origem] < centavos:
+                saldos[destino] += centavos
+                yield (i, f'{i:032x}', None, destino, 'deposito', valor_banco(centavos),
+                       '2026-01-01 00:00:00.000000', 'concluida')
+            else:
+                saldos[origem] -= centavos
+                saldos[destino] += centavos
+                yield (i, f'{i:032x}', origem, destino, 'transferencia', valor_banco(centavos),
+                       '2026-01-01 00:00:00.000000', 'concluida')
+
+    conexao = sqlite3.connect(caminho)
+    conexao.execute('PRAGMA journal_mode=OFF')
+    conexao.execute('PRAGMA synchronous=OFF')
+    # Índices recriados no fim: mais rápido que mantê-los durante a carga
+    indices = conexao.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'transacoes' AND sql IS NOT NULL"
+    ).fetchall()
+    for nome, _ in indices:
+        conexao.execute(f'DROP INDEX {nome}')
+    conexao.executemany(
+        'INSERT INTO transacoes (id, codigo_unico, conta_origem_id, conta_destino_id, tipo, valor, '
+        'data_transacao, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', linhas()
+    )
+    conexao.executemany(
+        'INSERT INTO contas (id, numero_conta, titular, cpf, saldo, ativo) VALUES (?, ?, ?, ?, ?, 1)',
+        ((i, f'{i:06d}', f'Conta {i}', f'{i:011d}', valor_banco(saldos[i])) for i in range(1, contas + 1))
+    )
+    for _, sql in indices:
+        conexao.execute(sql)
+    conexao.commit()
+    conexao.close()
+    return transacoes
+
+def tocar_contas(caminho, quantidade, contas, proximo_id, semente=7):
+    """Depósitos em `quantidade` contas espalhadas pela faixa de IDs, como um dia de movimento"""
+    from src.models.dinheiro import DINHEIRO_EM_CENTAVOS
+    fator = 1 if DINHEIRO_EM_CENTAVOS else 100
+    aleatorio = random.Random(semente)
+    tocadas = aleatorio.sample(range(1, contas + 1), min(quantidade, contas))
+    with sqlite3.connect(caminho) as conexao:
+        for posicao, conta_id in enumerate(tocadas):
+            transacao_id = proximo_id + posicao
+            conexao.execute(
+                'INSERT INTO transacoes (id, codigo_unico, conta_destino_id, tipo, valor, data_transacao, status) '
+                "VALUES (?, ?, ?, 'deposito', ?, '2026-01-02 00:00:00.000000', 'concluida')",
+                (transacao_id, f'{transacao_id:032x}', conta_id, 1000 / fator)
+            )
+            conexao.execute('UPDATE contas SET saldo = saldo + ? WHERE id = ?', (1000 / fator, conta_id))
+    return len(tocadas)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da reconciliação do razão')
+    parser.add_argument('--transacoes', type=int, default=10_000_000)
+    parser.add_argument('--contas', type=int, default=200_000)
+    parser.add_argument('--tocadas', type=int, default=5_000, help='contas movimentadas antes da execução incremental')
+    parser.add_argument('--processos', type=int, default=None, help='processos no pool (padrão: núcleos da máquina)')
+    parser.add_argument('--tamanho-particao', type=int, default=50000)
+    parser.add_argument('--manter', action='store_true', help='não apagar o banco gerado')
+    args = parser.parse_args()
+
+    diretorio = tempfile.mkdtemp(prefix='benchmark_reconciliacao_')
+    caminho = os.path.join(diretorio, 'razao.db')
+    os.environ['ARQUIVO_TRANSACOES_DIR'] = os.path.join(diretorio, 'arquivo')
+    try:
+        print(f"Gerando {args.transacoes:,} transações entre {args.contas:,} contas em {caminho}...")
+        inicio = time.perf_counter()
+        ultima_transacao_id = gerar_banco(caminho, args.transacoes, args.contas)
+        print(f"  {time.perf_counter() - inicio:.1f}s ({os.path.getsize(caminho) / 1e6:,.0f} MB)\n")
+
+        from src.services.reconciliacao import executar_reconciliacao
+        database_url = f'sqlite:///{caminho}'
+
+        completa = executar_reconciliacao(database_url, tamanho_particao=args.tamanho_particao, processos=args.processos)
+        segundos = completa['duracao_segundos']
+        print(f"Completa:    {completa['contas_verificadas']:,} contas, {len(completa['divergencias'])} divergência(s), "
+              f"{segundos:.1f}s ({args.transacoes / segundos:,.0f} transações/s)")
+
+        tocadas = tocar_contas(caminho, args.tocadas, args.contas, ultima_transacao_id + 1)
+        checkpoint = SimpleNamespace(ultima_transacao_id=completa['ultima_transacao_id'],
+                                     ultima_conta_id=completa['ultima_conta_id'])
+        incremental = executar_reconciliacao(database_url, checkpoint=checkpoint,
+                                             tamanho_particao=args.tamanho_particao, processos=args.processos)
+        print(f"Incremental: {incremental['contas_verificadas']:,} de {tocadas:,} contas tocadas, "
+              f"{len(incremental['divergencias'])} divergência(s), {incremental['duracao_segundos']:.1f}s")
+
+        if completa['divergencias'] or incremental['divergencias']:
+            sys.exit(1)
+    finally:
+        if args.manter:
+            print(f"\nBanco mantido em {caminho}")
+        else:
+            shutil.rmtree(diretorio, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
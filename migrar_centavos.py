@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Script para converter os valores monetários gravados no banco entre os modos
+'decimal' (NUMERIC(15, 2)) e 'centavos' (inteiros em centavos)
+
+Converte `contas.saldo` e `transacoes.valor` no banco principal e nas
+partições mensais arquivadas e registra o novo modo. Rode com a aplicação
+parada e depois inicie-a com `DINHEIRO_EM_CENTAVOS` correspondente.
+
+Uso:
+    python migrar_centavos.py               # decimal -> centavos
+    python migrar_centavos.py --reverter    # centavos -> decimal
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import sqlite3
+
+from sqlalchemy import create_engine, text
+from src.models.financial import MetadadosBanco
+
+CONVERSOES = {
+    'centavos': lambda coluna: f'CAST(ROUND({coluna} * 100) AS INTEGER)',
+    'decimal': lambda coluna: f'ROUND({coluna} / 100.0, 2)',
+}
+
+def _modo_particao(conexao):
+    try:
+        linha = conexao.execute("SELECT valor FROM metadados WHERE chave = 'modo_dinheiro'").fetchone()
+    except sqlite3.OperationalError:
+        linha = None
+    return linha[0] if linha else 'decimal'
+
+def migrar_particao(caminho, destino):
+    """Converter uma partição arquivada; devolve as linhas alteradas (0 se já estava convertida)"""
+    with sqlite3.connect(caminho) as conexao:
+        if _modo_particao(conexao) == destino:
+            return 0
+        alteradas = conexao.execute(f"UPDATE transacoes SET valor = {CONVERSOES[destino]('valor')}").rowcount
+        conexao.execute('CREATE TABLE IF NOT EXISTS metadados (chave TEXT NOT NULL PRIMARY KEY, valor TEXT NOT NULL)')
+        conexao.execute("INSERT OR REPLACE INTO metadados (chave, valor) VALUES ('modo_dinheiro', ?)", (destino,))
+    return alteradas
+
+def main():
+    parser = argparse.ArgumentParser(description='Conversão dos valores monetários para centavos inteiros')
+    parser.add_argument('--reverter', action='store_true', help='voltar de centavos inteiros para NUMERIC(15, 2)')
+    args = parser.parse_args()
+    destino = 'decimal' if args.reverter else 'centavos'
+
+    raiz = os.path.dirname(os.path.abspath(__file__))
+    database_url = os.environ.get('DATABASE_URL', f"sqlite:///{os.path.join(raiz, 'src', 'database', 'app.db')}")
+    diretorio_arquivo = os.environ.get('ARQUIVO_TRANSACOES_DIR', os.path.join(raiz, 'src', 'database', 'arquivo'))
+
+    engine = create_engine(database_url)
+    MetadadosBanco.__table__.create(engine, checkfirst=True)
+    with engine.begin() as conexao:
+        atual = conexao.execute(text("SELECT valor FROM metadados_banco WHERE chave = 'modo_dinheiro'")).scalar() or 'decimal'
+        particoes = conexao.execute(text('SELECT mes, arquivo FROM particoes_arquivo ORDER BY mes')).all()
+
+    # Partições primeiro: cada uma registra o próprio modo, então uma execução
+    # interrompida pode ser repetida sem converter nada duas vezes
+    for mes, arquivo in particoes:
+        caminho = os.path.join(diretorio_arquivo, arquivo)
+        if not os.path.exists(caminho):
+            print(f"Partição {mes}: arquivo {caminho} não encontrado, ignorada")
+            continue
+        print(f"Partição {mes}: {migrar_particao(caminho, destino)} transações convertidas")
+
+    if atual == destino:
+        print(f"O banco principal já está no modo '{destino}'.")
+        return
+
+    with engine.begin() as conexao:
+        contas = conexao.execute(text(f"UPDATE contas SET saldo = {CONVERSOES[destino]('saldo')}")).rowcount
+        transacoes = conexao.execute(text(f"UPDATE transacoes SET valor = {CONVERSOES[destino]('valor')}")).rowcount
+        conexao.execute(text("DELETE FROM metadados_banco WHERE chave = 'modo_dinheiro'"))
+        conexao.execute(text("INSERT INTO metadados_banco (chave, valor) VALUES ('modo_dinheiro', :modo)"), {'modo': destino})
+
+    print(f"Banco principal: {contas} contas e {transacoes} transações convertidas de '{atual}' para '{destino}'.")
+    print(f"Inicie a aplicação com DINHEIRO_EM_CENTAVOS={'1' if destino == 'centavos' else '0'}.")
+
+if __name__ == '__main__':
+    main()
@@ -8,7 +8,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from src.models.user import db
-from src.models.financial import Conta, Transacao
+from src.models.financial import Conta, Transacao, verificar_modo_dinheiro
 from src.main import app
 from decimal import Decimal
 from datetime import datetime, timedelta
@@ -21,6 +21,7 @@ def criar_dados_exemplo():
         # Limpar dados existentes
         db.drop_all()
         db.create_all()
+        verificar_modo_dinheiro()
 
         print("Criando contas de exemplo...")
 
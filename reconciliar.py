@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Script para reconciliar os saldos das contas com o razão de transações
+
+Uso:
+    python reconciliar.py                 # incremental a partir do último checkpoint
+    python reconciliar.py --completo      # verifica todas as contas
+    python reconciliar.py --processos 8 --tamanho-particao 100000 --relatorio divergencias.json
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import json
+
+from src.models.user import db
+from src.models.financial import CheckpointReconciliacao
+from src.main import app
+from src.services.reconciliacao import executar_reconciliacao
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconciliação de saldos com o razão de transações')
+    parser.add_argument('--completo', action='store_true', help='ignorar o checkpoint e verificar todas as contas')
+    parser.add_argument('--processos', type=int, default=None, help='processos no pool (padrão: núcleos da máquina)')
+    parser.add_argument('--tamanho-particao', type=int, default=50000, help='quantidade de IDs de conta por partição')
+    parser.add_argument('--relatorio', help='arquivo JSON para gravar as divergências encontradas')
+    args = parser.parse_args()
+
+    with app.app_context():
+        database_url = db.engine.url.render_as_string(hide_password=False)
+        checkpoint = None
+        if not args.completo:
+            checkpoint = CheckpointReconciliacao.query.order_by(CheckpointReconciliacao.id.desc()).first()
+
+        if checkpoint:
+            print(f"Reconciliação incremental desde {checkpoint.executado_em.isoformat()} "
+                  f"(transação #{checkpoint.ultima_transacao_id})...")
+        else:
+            print("Reconciliação completa...")
+
+        resultado = executar_reconciliacao(
+            database_url,
+            checkpoint=checkpoint,
+            tamanho_particao=args.tamanho_particao,
+            processos=args.processos
+        )
+
+        db.session.add(CheckpointReconciliacao(
+            incremental=resultado['incremental'],
+            ultima_transacao_id=resultado['ultima_transacao_id'],
+            ultima_conta_id=resultado['ultima_conta_id'],
+            contas_verificadas=resultado['contas_verificadas'],
+            divergencias=len(resultado['divergencias'])
+        ))
+        db.session.commit()
+
+    for divergencia in resultado['divergencias']:
+        janela = divergencia['janela']
+        print(f"❌ Conta {divergencia['numero_conta']} (id {divergencia['conta_id']}): "
+              f"saldo R$ {divergencia['saldo']:,.2f}, razão R$ {divergencia['saldo_calculado']:,.2f}, "
+              f"diferença R$ {divergencia['diferenca']:,.2f}")
+        print(f"   Janela: transações #{janela['primeira_transacao_id']} a #{janela['ultima_transacao_id']} "
+              f"({janela['inicio']} a {janela['fim']}, {janela['transacoes']} transações)")
+
+    if args.relatorio:
+        with open(args.relatorio, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+
+    if checkpoint and not resultado['incremental']:
+        print("⚠️  O maior ID de transação é menor que o do checkpoint: execução feita como completa")
+
+    print(f"\nPartições: {resultado['particoes']}")
+    print(f"Contas verificadas: {resultado['contas_verificadas']}")
+    print(f"Divergências: {len(resultado['divergencias'])}")
+    print(f"Duração: {resultado['duracao_segundos']:.1f}s")
+
+    return 1 if resultado['divergencias'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,13 +3,20 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory, request, jsonify
+from flask import Flask, request, jsonify
 from flask_cors import CORS
 from src.models.user import db
-from src.models.financial import Conta, Transacao
+from src.models.financial import Conta, Transacao, verificar_modo_dinheiro
 from src.routes.user import user_bp
 from src.routes.financial import financial_bp
 from src.routes.validation import validation_bp
+from src.services.fila_transferencias import fila_transferencias
+from src.services.arquivo_transacoes import arquivo_transacoes
+from src.services.eventos import eventos
+from src.services.estaticos import estaticos
+from src.services.compressao import compressao
+from src.services.admissao import admissao
+from src.services.roteamento import roteamento, url_leitura
 from decimal import Decimal
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
@@ -23,11 +30,45 @@ app.register_blueprint(financial_bp, url_prefix='/api')
 app.register_blueprint(validation_bp, url_prefix='/api')
 
 # uncomment if you need to use database
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+    'DATABASE_URL', f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+)
+# Pool separado para as rotas de consulta: réplica em DATABASE_READ_URL ou o
+# mesmo arquivo SQLite aberto em modo somente leitura
+url_somente_leitura = os.environ.get('DATABASE_READ_URL') or url_leitura(app.config['SQLALCHEMY_DATABASE_URI'])
+if url_somente_leitura:
+    app.config['SQLALCHEMY_BINDS'] = {'leitura': url_somente_leitura}
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 with app.app_context():
     db.create_all()
+    # create_all não adiciona índices novos a tabelas que já existem
+    for tabela in db.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(db.engine, checkfirst=True)
+    # Dinheiro em NUMERIC ou em centavos inteiros: o banco precisa estar no modo da aplicação
+    verificar_modo_dinheiro()
+
+# Fila de liquidação das transferências assíncronas
+fila_transferencias.init_app(app)
+
+# Stream de eventos de saldo por conta (SSE)
+eventos.init_app(app)
+
+# Partições mensais arquivadas do razão
+arquivo_transacoes.init_app(app)
+
+# Manifesto em memória dos arquivos estáticos do frontend
+estaticos.init_app(app)
+
+# Compressão gzip/brotli das respostas grandes
+compressao.init_app(app)
+
+# Limites de taxa e de escritas simultâneas nos endpoints de movimentação
+admissao.init_app(app)
+
+# Rotas de consulta no pool de leitura, com leia-suas-escritas
+roteamento.init_app(app)
 
 # NOVA ROTA PARA CRIAR CONTAS PELO SITE
 @app.route('/api/contas', methods=['POST'])
@@ -50,18 +91,10 @@ def criar_conta():
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
+    if app.static_folder is None:
         return "Static folder not configured", 404
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+    return estaticos.servir(path)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
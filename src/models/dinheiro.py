@@ -0,0 +1,84 @@
+"""
+Representação dos valores monetários no banco.
+
+Por padrão `Conta.saldo` e `Transacao.valor` são gravados como NUMERIC(15, 2).
+Com `DINHEIRO_EM_CENTAVOS=1` eles são gravados como inteiros em centavos, e
+somas, comparações e débitos feitos no banco ficam em aritmética inteira e
+exata. Nos dois modos os modelos continuam expondo `Decimal` com duas casas,
+então as rotas e a serialização não mudam.
+
+O modo é lido do ambiente na importação porque define o tipo das colunas. O
+banco registra em `metadados_banco` o modo em que foi gravado e
+`migrar_centavos.py` converte os dados existentes de um modo para o outro.
+"""
+
+import os
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import BigInteger, Integer, Numeric, cast, func, type_coerce
+from sqlalchemy.types import TypeDecorator
+
+DINHEIRO_EM_CENTAVOS = os.environ.get('DINHEIRO_EM_CENTAVOS', '0') == '1'
+MODO_DINHEIRO = 'centavos' if DINHEIRO_EM_CENTAVOS else 'decimal'
+
+
+def para_centavos(valor):
+    """Converter um valor em reais (Decimal, int, float ou str) em centavos inteiros"""
+    if not isinstance(valor, Decimal):
+        valor = Decimal(str(valor))
+    return int((valor * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def de_centavos(centavos):
+    """Converter centavos inteiros em Decimal com duas casas"""
+    return Decimal(centavos).scaleb(-2)
+
+
+def ao_centavo(valor):
+    """Arredondar um valor em reais ao centavo, com a mesma regra usada na gravação"""
+    return de_centavos(para_centavos(valor))
+
+
+class Dinheiro(TypeDecorator):
+    """NUMERIC(15, 2) ou BIGINT em centavos, conforme `DINHEIRO_EM_CENTAVOS`"""
+
+    impl = Numeric(15, 2)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if DINHEIRO_EM_CENTAVOS:
+            return dialect.type_descriptor(BigInteger())
+        return dialect.type_descriptor(Numeric(15, 2))
+
+    def process_bind_param(self, value, dialect):
+        # Arredonda ao centavo nos dois modos, como uma coluna NUMERIC(15, 2)
+        if value is None:
+            return value
+        centavos = para_centavos(value)
+        return centavos if DINHEIRO_EM_CENTAVOS else de_centavos(centavos)
+
+    def process_result_value(self, value, dialect):
+        if value is None or not DINHEIRO_EM_CENTAVOS:
+            return value
+        return de_centavos(value)
+
+
+def expressao_centavos(coluna):
+    """Expressão SQL com o valor de uma coluna `Dinheiro` em centavos inteiros"""
+    if DINHEIRO_EM_CENTAVOS:
+        return type_coerce(coluna, BigInteger)
+    return cast(func.round(coluna * 100), Integer)
+
+
+def sql_centavos(coluna):
+    """O mesmo que `expressao_centavos`, para SQL textual"""
+    if DINHEIRO_EM_CENTAVOS:
+        return coluna
+    return f'CAST(ROUND({coluna} * 100) AS INTEGER)'
+
+
+def arredondar(expressao):
+    """Resultado de aritmética de saldo no banco: inteiro em centavos ou arredondado a duas casas"""
+    if DINHEIRO_EM_CENTAVOS:
+        return expressao
+    return func.round(expressao, 2)
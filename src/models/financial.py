@@ -1,4 +1,5 @@
 from src.models.user import db
+from src.models.dinheiro import Dinheiro, MODO_DINHEIRO, arredondar
 from datetime import datetime
 import uuid
 
@@ -9,7 +10,7 @@ class Conta(db.Model):
     numero_conta = db.Column(db.String(20), unique=True, nullable=False)
     titular = db.Column(db.String(100), nullable=False)
     cpf = db.Column(db.String(11), unique=True, nullable=False)
-    saldo = db.Column(db.Numeric(15, 2), default=0.00, nullable=False)
+    saldo = db.Column(Dinheiro, default=0.00, nullable=False)
     data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
     ativo = db.Column(db.Boolean, default=True)
     
@@ -20,6 +21,30 @@ class Conta(db.Model):
     def __repr__(self):
         return f'<Conta {self.numero_conta} - {self.titular}>'
     
+    def debitar(self, valor):
+        """
+        Debitar `valor` com um UPDATE condicional no banco, atômico entre
+        workers; devolve False (sem alterar nada) se o saldo não for suficiente
+        """
+        resultado = db.session.execute(
+            db.update(Conta)
+            .where(Conta.id == self.id, Conta.saldo >= valor)
+            .values(saldo=arredondar(Conta.saldo - valor))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.expire(self, ['saldo'])
+        return resultado.rowcount == 1
+    
+    def creditar(self, valor):
+        """Creditar `valor` somando no próprio banco, sem ler e regravar o saldo"""
+        db.session.execute(
+            db.update(Conta)
+            .where(Conta.id == self.id)
+            .values(saldo=arredondar(Conta.saldo + valor))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.expire(self, ['saldo'])
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -39,11 +64,17 @@ class Transacao(db.Model):
     conta_origem_id = db.Column(db.Integer, db.ForeignKey('contas.id'), nullable=True)
     conta_destino_id = db.Column(db.Integer, db.ForeignKey('contas.id'), nullable=True)
     tipo = db.Column(db.String(20), nullable=False)  # 'transferencia', 'deposito', 'saque'
-    valor = db.Column(db.Numeric(15, 2), nullable=False)
+    valor = db.Column(Dinheiro, nullable=False)
     descricao = db.Column(db.String(200))
     data_transacao = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(20), default='concluida')  # 'pendente', 'concluida', 'cancelada'
     
+    # Índices (conta, data, id): extrato paginado por cursor e agregações por faixa de conta
+    __table_args__ = (
+        db.Index('ix_transacoes_origem_data', 'conta_origem_id', 'data_transacao', 'id'),
+        db.Index('ix_transacoes_destino_data', 'conta_destino_id', 'data_transacao', 'id'),
+    )
+    
     def __repr__(self):
         return f'<Transacao {self.codigo_unico} - {self.tipo} - R$ {self.valor}>'
     
@@ -59,3 +90,112 @@ class Transacao(db.Model):
             'data_transacao': self.data_transacao.isoformat(),
             'status': self.status
         }
+
+class CheckpointReconciliacao(db.Model):
+    __tablename__ = 'reconciliacao_checkpoints'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    executado_em = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    incremental = db.Column(db.Boolean, default=False, nullable=False)
+    ultima_transacao_id = db.Column(db.Integer, nullable=False)  # maior Transacao.id coberto pela execução
+    ultima_conta_id = db.Column(db.Integer, nullable=False)  # maior Conta.id coberto pela execução
+    contas_verificadas = db.Column(db.Integer, default=0, nullable=False)
+    divergencias = db.Column(db.Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f'<CheckpointReconciliacao {self.executado_em} - {self.divergencias} divergências>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'executado_em': self.executado_em.isoformat(),
+            'incremental': self.incremental,
+            'ultima_transacao_id': self.ultima_transacao_id,
+            'ultima_conta_id': self.ultima_conta_id,
+            'contas_verificadas': self.contas_verificadas,
+            'divergencias': self.divergencias
+        }
+
+class ParticaoArquivo(db.Model):
+    __tablename__ = 'particoes_arquivo'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    mes = db.Column(db.String(7), unique=True, nullable=False)  # 'AAAA-MM'
+    arquivo = db.Column(db.String(200), nullable=False)  # nome do arquivo SQLite no diretório de arquivo
+    inicio = db.Column(db.DateTime, nullable=False)  # início do mês (inclusivo)
+    fim = db.Column(db.DateTime, nullable=False)  # início do mês seguinte (exclusivo)
+    total_transacoes = db.Column(db.Integer, default=0, nullable=False)
+    arquivado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ParticaoArquivo {self.mes} - {self.total_transacoes} transações>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'mes': self.mes,
+            'arquivo': self.arquivo,
+            'inicio': self.inicio.isoformat(),
+            'fim': self.fim.isoformat(),
+            'total_transacoes': self.total_transacoes,
+            'arquivado_em': self.arquivado_em.isoformat()
+        }
+
+class ResumoArquivo(db.Model):
+    """Totais por conta das transações concluídas de cada mês arquivado"""
+    __tablename__ = 'resumo_arquivo'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    mes = db.Column(db.String(7), nullable=False, index=True)
+    conta_id = db.Column(db.Integer, db.ForeignKey('contas.id'), nullable=False, index=True)
+    entradas_centavos = db.Column(db.BigInteger, default=0, nullable=False)
+    saidas_centavos = db.Column(db.BigInteger, default=0, nullable=False)
+
+class IndiceArquivo(db.Model):
+    """Mês da partição de cada transação arquivada, para buscá-la pelo código único"""
+    __tablename__ = 'indice_arquivo'
+    
+    codigo_unico = db.Column(db.String(36), primary_key=True)
+    mes = db.Column(db.String(7), nullable=False, index=True)
+
+class EventoConta(db.Model):
+    """Outbox de eventos por conta, gravado na mesma transação da movimentação"""
+    __tablename__ = 'eventos_conta'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    conta_id = db.Column(db.Integer, db.ForeignKey('contas.id'), nullable=False)
+    tipo = db.Column(db.String(20), nullable=False)  # 'transacao'
+    dados = db.Column(db.Text, nullable=False)  # JSON
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    __table_args__ = (
+        db.Index('ix_eventos_conta_conta_id', 'conta_id', 'id'),
+    )
+    
+    def __repr__(self):
+        return f'<EventoConta {self.id} - conta {self.conta_id} - {self.tipo}>'
+
+class MetadadosBanco(db.Model):
+    """Informações sobre o próprio banco, como o modo em que o dinheiro está gravado"""
+    __tablename__ = 'metadados_banco'
+    
+    chave = db.Column(db.String(50), primary_key=True)
+    valor = db.Column(db.String(200), nullable=False)
+
+def verificar_modo_dinheiro():
+    """
+    Registrar o modo de dinheiro em um banco novo ou conferir o de um banco
+    existente (bancos gravados antes do registro estão no modo 'decimal')
+    """
+    registro = db.session.get(MetadadosBanco, 'modo_dinheiro')
+    if registro is None:
+        vazio = db.session.query(Conta.id).first() is None and db.session.query(Transacao.id).first() is None
+        registro = MetadadosBanco(chave='modo_dinheiro', valor=MODO_DINHEIRO if vazio else 'decimal')
+        db.session.add(registro)
+        db.session.commit()
+    
+    if registro.valor != MODO_DINHEIRO:
+        raise RuntimeError(
+            f"O banco está gravado no modo de dinheiro '{registro.valor}', mas a aplicação usa "
+            f"'{MODO_DINHEIRO}' (DINHEIRO_EM_CENTAVOS). Converta os dados com migrar_centavos.py."
+        )
@@ -0,0 +1,20 @@
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+
+class SessaoRoteada(Session):
+    """
+    Sessão que envia as consultas das rotas somente leitura para o engine
+    `leitura` (SQLALCHEMY_BINDS), quando configurado. Flushes e qualquer
+    requisição não marcada continuam no banco primário.
+    """
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and has_app_context()
+            and g.get('somente_leitura')
+            and 'leitura' in self._db.engines
+        ):
+            return self._db.engines['leitura']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
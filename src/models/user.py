@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
+from src.models.sessao import SessaoRoteada
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': SessaoRoteada})
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -1,12 +1,25 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from src.models.financial import db, Conta, Transacao
-from decimal import Decimal
+from src.models.dinheiro import ao_centavo, expressao_centavos
+from src.routes.validation import validar_cpf
+from src.services.fila_transferencias import fila_transferencias, FilaCheia
+from src.services.arquivo_transacoes import arquivo_transacoes
+from src.services.eventos import eventos, registrar_eventos, formatar_evento
+from decimal import Decimal, InvalidOperation
+import base64
+import json
+import queue
+import re
 import uuid
 from datetime import datetime, timedelta
-from sqlalchemy import desc, and_
+from sqlalchemy import desc, and_, case, cast, func, insert, tuple_, Integer
+from sqlalchemy.exc import IntegrityError
 
 financial_bp = Blueprint('financial', __name__)
 
+TAMANHO_BLOCO_LOTE = 1000
+AGRUPAMENTOS_EXTRATO = {'dia': '%Y-%m-%d', 'mes': '%Y-%m'}
+
 @financial_bp.route('/contas', methods=['POST'])
 def criar_conta():
     """Criar uma nova conta bancária"""
@@ -45,6 +58,194 @@ def criar_conta():
         db.session.rollback()
         return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
 
+def _validar_linha_conta(item):
+    """Validar uma linha do lote e devolver (dados normalizados, erro)"""
+    if not isinstance(item, dict):
+        return None, 'Linha deve ser um objeto JSON'
+    if not item.get('titular') or not item.get('cpf'):
+        return None, 'Titular e CPF são obrigatórios'
+    if not isinstance(item['titular'], str) or len(item['titular']) > 100:
+        return None, 'Titular deve ser um texto de até 100 caracteres'
+    
+    valido, mensagem = validar_cpf(str(item['cpf']))
+    if not valido:
+        return None, mensagem
+    
+    try:
+        saldo = Decimal(str(item.get('saldo_inicial', 0)))
+        if not saldo.is_finite():
+            return None, 'saldo_inicial inválido'
+        saldo = ao_centavo(saldo)
+        if saldo < 0:
+            return None, 'saldo_inicial não pode ser negativo'
+    except InvalidOperation:
+        return None, 'saldo_inicial inválido'
+    
+    return {
+        'titular': item['titular'],
+        'cpf': re.sub(r'[^0-9]', '', str(item['cpf'])),
+        'saldo': saldo
+    }, None
+
+def _inserir_bloco_contas(validas):
+    """Inserir um bloco de contas já validadas com executemany e devolver {cpf: (id, numero_conta)}"""
+    # Números de conta alocados em sequência a partir do maior existente
+    ultimo_numero = db.session.query(func.max(cast(Conta.numero_conta, Integer))).scalar() or 0
+    linhas_contas = [
+        {
+            'numero_conta': f"{ultimo_numero + posicao:06d}",
+            'titular': dados['titular'],
+            'cpf': dados['cpf'],
+            'saldo': dados['saldo']
+        }
+        for posicao, dados in enumerate(validas, start=1)
+    ]
+    db.session.execute(insert(Conta), linhas_contas)
+    
+    cpfs = [dados['cpf'] for dados in validas]
+    criadas = {
+        cpf: (conta_id, numero_conta)
+        for conta_id, numero_conta, cpf in db.session.query(Conta.id, Conta.numero_conta, Conta.cpf).filter(Conta.cpf.in_(cpfs))
+    }
+    
+    # Saldo inicial registrado como depósito para manter o razão reconciliável
+    depositos = [
+        {
+            'codigo_unico': str(uuid.uuid4()),
+            'conta_destino_id': criadas[dados['cpf']][0],
+            'tipo': 'deposito',
+            'valor': dados['saldo'],
+            'descricao': 'Saldo inicial',
+            'status': 'concluida'
+        }
+        for dados in validas if dados['saldo'] > 0
+    ]
+    if depositos:
+        db.session.execute(insert(Transacao), depositos)
+    
+    db.session.commit()
+    return criadas
+
+def _processar_bloco_contas(bloco):
+    """Processar um bloco de (linha, item) e devolver o resultado de cada linha"""
+    resultados = {}
+    validas = []
+    vistos = set()
+    for linha, item in bloco:
+        dados, erro = _validar_linha_conta(item)
+        if dados and dados['cpf'] in vistos:
+            erro = 'CPF duplicado no lote'
+        if erro:
+            resultados[linha] = {'linha': linha, 'status': 'erro', 'erro': erro}
+            continue
+        vistos.add(dados['cpf'])
+        validas.append((linha, dados))
+    
+    # Unicidade do bloco inteiro em uma única consulta IN
+    if validas:
+        existentes = {
+            cpf for (cpf,) in db.session.query(Conta.cpf).filter(Conta.cpf.in_([dados['cpf'] for _, dados in validas]))
+        }
+        for linha, dados in validas:
+            if dados['cpf'] in existentes:
+                resultados[linha] = {'linha': linha, 'status': 'erro', 'erro': 'CPF já cadastrado'}
+        validas = [(linha, dados) for linha, dados in validas if linha not in resultados]
+    
+    if validas:
+        # Uma nova tentativa cobre a corrida com outro cadastro pelo mesmo número de conta
+        for _ in range(2):
+            try:
+                criadas = _inserir_bloco_contas([dados for _, dados in validas])
+                break
+            except IntegrityError:
+                db.session.rollback()
+                criadas = None
+        
+        for linha, dados in validas:
+            if criadas is None:
+                resultados[linha] = {'linha': linha, 'status': 'erro', 'erro': 'Conflito ao inserir o bloco, reenvie a linha'}
+            else:
+                conta_id, numero_conta = criadas[dados['cpf']]
+                resultados[linha] = {'linha': linha, 'status': 'criada', 'conta_id': conta_id, 'numero_conta': numero_conta}
+    
+    return [resultados[linha] for linha, _ in bloco]
+
+def _processar_bloco_seguro(bloco):
+    """Processar um bloco; uma falha inesperada vira erro nas linhas do bloco, sem derrubar o lote"""
+    try:
+        return _processar_bloco_contas(bloco)
+    except Exception as e:
+        db.session.rollback()
+        return [{'linha': linha, 'status': 'erro', 'erro': f'Erro interno: {str(e)}'} for linha, _ in bloco]
+
+def _blocos(itens, tamanho=TAMANHO_BLOCO_LOTE):
+    bloco = []
+    for item in itens:
+        bloco.append(item)
+        if len(bloco) >= tamanho:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+def _linhas_ndjson(stream):
+    """Ler um upload NDJSON linha a linha, sem carregar o corpo inteiro"""
+    numero = 0
+    for linha_bruta in stream:
+        if not linha_bruta.strip():
+            continue
+        numero += 1
+        try:
+            yield numero, json.loads(linha_bruta)
+        except ValueError:
+            yield numero, None
+
+@financial_bp.route('/contas/lote', methods=['POST'])
+def criar_contas_lote():
+    """Criar contas em lote a partir de um array JSON ou de um upload NDJSON"""
+    try:
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            # Upload em streaming: uma linha de resultado por conta, bloco a bloco
+            def gerar():
+                resumo = {'total': 0, 'criadas': 0, 'erros': 0}
+                try:
+                    for bloco in _blocos(_linhas_ndjson(request.stream)):
+                        for resultado in _processar_bloco_seguro(bloco):
+                            resumo['total'] += 1
+                            resumo['criadas' if resultado['status'] == 'criada' else 'erros'] += 1
+                            yield json.dumps(resultado) + '\n'
+                except Exception as e:
+                    # O status 200 já foi enviado: a falha vai no próprio stream
+                    db.session.rollback()
+                    resumo['interrompido'] = True
+                    yield json.dumps({'erro': f'Erro interno: {str(e)}'}) + '\n'
+                yield json.dumps({'resumo': resumo}) + '\n'
+            
+            return Response(stream_with_context(gerar()), mimetype='application/x-ndjson')
+        
+        data = request.get_json()
+        if not isinstance(data, list):
+            return jsonify({'erro': 'Envie um array JSON de contas ou um upload application/x-ndjson'}), 400
+        
+        resultados = []
+        for bloco in _blocos(enumerate(data, start=1)):
+            resultados.extend(_processar_bloco_seguro(bloco))
+        criadas = sum(1 for resultado in resultados if resultado['status'] == 'criada')
+        
+        return jsonify({
+            'sucesso': True,
+            'resumo': {
+                'total': len(resultados),
+                'criadas': criadas,
+                'erros': len(resultados) - criadas
+            },
+            'resultados': resultados
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
+
 @financial_bp.route('/contas', methods=['GET'])
 def listar_contas():
     """Listar todas as contas"""
@@ -81,8 +282,15 @@ def realizar_transferencia():
         for campo in campos_obrigatorios:
             if campo not in data:
                 return jsonify({'erro': f'Campo {campo} é obrigatório'}), 400
+        for campo in ('conta_origem_id', 'conta_destino_id'):
+            if not isinstance(data[campo], (int, str)):
+                return jsonify({'erro': f'Campo {campo} inválido'}), 400
         
         valor = Decimal(str(data['valor']))
+        if not valor.is_finite():
+            return jsonify({'erro': 'Valor inválido'}), 400
+        # O valor é gravado arredondado ao centavo: valida e responde com o mesmo valor
+        valor = ao_centavo(valor)
         if valor <= 0:
             return jsonify({'erro': 'Valor deve ser maior que zero'}), 400
         
@@ -108,11 +316,54 @@ def realizar_transferencia():
         # Gerar código único para a transação
         codigo_unico = str(uuid.uuid4())
         
+        # Modo assíncrono: registra a transação como pendente e devolve 202;
+        # a liquidação é feita pela fila de transferências
+        if data.get('assincrono'):
+            if not fila_transferencias.tem_capacidade():
+                resposta = jsonify({'erro': 'Fila de transferências cheia, tente novamente em instantes'})
+                resposta.headers['Retry-After'] = '5'
+                return resposta, 503
+            
+            nova_transacao = Transacao(
+                codigo_unico=codigo_unico,
+                conta_origem_id=conta_origem.id,
+                conta_destino_id=conta_destino.id,
+                tipo='transferencia',
+                valor=valor,
+                descricao=data.get('descricao', f'Transferência de {conta_origem.titular} para {conta_destino.titular}'),
+                status='pendente'
+            )
+            db.session.add(nova_transacao)
+            registrar_eventos(nova_transacao, conta_origem, conta_destino)
+            db.session.commit()
+            eventos.notificar()
+            
+            try:
+                fila_transferencias.enfileirar(nova_transacao.id)
+            except FilaCheia:
+                # A transação já está gravada como pendente; a varredura da fila a recupera
+                pass
+            
+            return jsonify({
+                'sucesso': True,
+                'codigo_transacao': codigo_unico,
+                'valor': float(valor),
+                'status': 'pendente',
+                'status_url': f'/api/transacoes/{codigo_unico}',
+                'mensagem': 'Transferência recebida e aguardando processamento'
+            }), 202, {'Location': f'/api/transacoes/{codigo_unico}'}
+        
         # Iniciar transação no banco de dados
         try:
-            # Atualizar saldos
-            conta_origem.saldo -= valor
-            conta_destino.saldo += valor
+            # Atualizar saldos no próprio banco: o débito só acontece se o saldo
+            # ainda for suficiente, mesmo com outra transferência concorrente
+            if not conta_origem.debitar(valor):
+                db.session.rollback()
+                return jsonify({
+                    'erro': 'Saldo insuficiente',
+                    'saldo_disponivel': float(conta_origem.saldo)
+                }), 400
+            conta_destino.creditar(valor)
             
             # Registrar a transação
             nova_transacao = Transacao(
@@ -126,7 +377,9 @@ def realizar_transferencia():
             )
             
             db.session.add(nova_transacao)
+            registrar_eventos(nova_transacao, conta_origem, conta_destino)
             db.session.commit()
+            eventos.notificar()
             
             return jsonify({
                 'sucesso': True,
@@ -153,6 +406,76 @@ def realizar_transferencia():
     except Exception as e:
         return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
 
+def _codificar_cursor(data_transacao, transacao_id):
+    """Cursor opaco com a posição (data, id) da última transação da página"""
+    bruto = json.dumps([data_transacao.isoformat(), transacao_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(bruto).decode('ascii').rstrip('=')
+
+def _decodificar_cursor(cursor):
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data_transacao, transacao_id = json.loads(bruto)
+        return datetime.fromisoformat(data_transacao), int(transacao_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError('cursor inválido') from e
+
+def _pagina_transacoes(conta_id, filtros, posicao, quantidade):
+    """
+    Transações da conta ordenadas por (data, id) decrescentes, a partir do
+    cursor. Origem e destino são consultados separadamente para que cada
+    consulta seja uma varredura limitada no índice (conta, data, id).
+    """
+    if posicao is not None:
+        filtros = filtros + [tuple_(Transacao.data_transacao, Transacao.id) < tuple_(*posicao)]
+    ordem = (desc(Transacao.data_transacao), desc(Transacao.id))
+    transacoes = {}
+    for coluna in (Transacao.conta_origem_id, Transacao.conta_destino_id):
+        for transacao in Transacao.query.filter(coluna == conta_id, *filtros).order_by(*ordem).limit(quantidade):
+            transacoes[transacao.id] = transacao
+    return sorted(transacoes.values(), key=lambda t: (t.data_transacao, t.id), reverse=True)[:quantidade]
+
+def _totais_extrato(query, conta_id, data_inicio, data_fim, formato_periodo=None):
+    """
+    Entradas, saídas, fluxo líquido e quantidade das transações concluídas do
+    extrato, com um único agregado SQL sobre os mesmos filtros da listagem
+    (somado aos agregados das partições arquivadas do período)
+    """
+    centavos = expressao_centavos(Transacao.valor)
+    periodo = func.strftime(formato_periodo, Transacao.data_transacao) if formato_periodo else None
+    colunas = [
+        func.sum(case((Transacao.conta_destino_id == conta_id, centavos), else_=0)),
+        func.sum(case((Transacao.conta_origem_id == conta_id, centavos), else_=0)),
+        func.count(Transacao.id)
+    ]
+    agregado = query.filter(Transacao.status == 'concluida')
+    if periodo is not None:
+        linhas = agregado.with_entities(periodo, *colunas).group_by(periodo).all()
+    else:
+        linhas = [(None, *agregado.with_entities(*colunas).one())]
+    
+    por_periodo = arquivo_transacoes.totais_conta(conta_id, data_inicio, data_fim, formato_periodo)
+    for chave, entradas, saidas, quantidade in linhas:
+        acumulado = por_periodo.setdefault(chave, [0, 0, 0])
+        acumulado[0] += entradas or 0
+        acumulado[1] += saidas or 0
+        acumulado[2] += quantidade
+    
+    def resumo(entradas, saidas, quantidade):
+        return {
+            'entradas': entradas / 100,
+            'saidas': saidas / 100,
+            'fluxo_liquido': (entradas - saidas) / 100,
+            'quantidade': quantidade
+        }
+    
+    totais = resumo(*(sum(valores[i] for valores in por_periodo.values()) for i in range(3)))
+    if formato_periodo:
+        totais['por_periodo'] = [
+            {'periodo': chave, **resumo(*por_periodo[chave])}
+            for chave in sorted(por_periodo, reverse=True)
+        ]
+    return totais
+
 @financial_bp.route('/extrato/<int:conta_id>', methods=['GET'])
 def obter_extrato(conta_id):
     """Obter extrato de uma conta com as últimas transações"""
@@ -165,58 +488,100 @@ def obter_extrato(conta_id):
         limite = request.args.get('limite', 10, type=int)
         data_inicio = request.args.get('data_inicio')
         data_fim = request.args.get('data_fim')
+        data_inicio_obj = None
+        data_fim_obj = None
+        filtros_data = []
         
-        # Query base para transações
-        query = Transacao.query.filter(
-            (Transacao.conta_origem_id == conta_id) | 
-            (Transacao.conta_destino_id == conta_id)
-        )
+        if limite < 1:
+            return jsonify({'erro': 'limite deve ser maior que zero'}), 400
+        
+        # Posição da página anterior (paginação por cursor)
+        posicao = None
+        if request.args.get('cursor'):
+            try:
+                posicao = _decodificar_cursor(request.args['cursor'])
+            except ValueError:
+                return jsonify({'erro': 'cursor inválido'}), 400
         
         # Filtros de data
         if data_inicio:
             try:
                 data_inicio_obj = datetime.fromisoformat(data_inicio)
-                query = query.filter(Transacao.data_transacao >= data_inicio_obj)
+                filtros_data.append(Transacao.data_transacao >= data_inicio_obj)
             except ValueError:
                 return jsonify({'erro': 'Formato de data_inicio inválido. Use ISO format (YYYY-MM-DD)'}), 400
         
         if data_fim:
             try:
                 data_fim_obj = datetime.fromisoformat(data_fim)
-                query = query.filter(Transacao.data_transacao <= data_fim_obj)
+                filtros_data.append(Transacao.data_transacao <= data_fim_obj)
             except ValueError:
                 return jsonify({'erro': 'Formato de data_fim inválido. Use ISO format (YYYY-MM-DD)'}), 400
         
-        # Ordenar por data decrescente e limitar
-        transacoes = query.order_by(desc(Transacao.data_transacao)).limit(limite).all()
+        # Query base para transações
+        query = Transacao.query.filter(
+            (Transacao.conta_origem_id == conta_id) | 
+            (Transacao.conta_destino_id == conta_id),
+            *filtros_data
+        )
+        
+        # Totais do período calculados no banco, opcionalmente agrupados por dia/mês
+        totais = None
+        if request.args.get('totais', 'false').lower() in ('1', 'true', 'sim'):
+            agrupamento = request.args.get('agrupamento')
+            if agrupamento and agrupamento not in AGRUPAMENTOS_EXTRATO:
+                return jsonify({'erro': 'agrupamento inválido. Use dia ou mes'}), 400
+            totais = _totais_extrato(query, conta_id, data_inicio_obj, data_fim_obj, AGRUPAMENTOS_EXTRATO.get(agrupamento))
+        
+        # Página ordenada por (data, id) decrescentes; um item a mais indica se há próxima página
+        transacoes = _pagina_transacoes(conta_id, filtros_data, posicao, limite + 1)
+        extrato_transacoes = [transacao.to_dict() for transacao in transacoes]
+        
+        # Completar com as partições arquivadas; se a tabela quente já encheu a
+        # página, só entram partições com transações mais novas que a última dela
+        corte = transacoes[-1].data_transacao if len(transacoes) > limite else None
+        extrato_transacoes.extend(
+            arquivo_transacoes.transacoes_conta(conta_id, data_inicio_obj, data_fim_obj, limite + 1, corte, posicao)
+        )
+        extrato_transacoes.sort(key=lambda t: (datetime.fromisoformat(t['data_transacao']), t['id']), reverse=True)
+        
+        proximo_cursor = None
+        if len(extrato_transacoes) > limite:
+            extrato_transacoes = extrato_transacoes[:limite]
+            ultima = extrato_transacoes[-1]
+            proximo_cursor = _codificar_cursor(datetime.fromisoformat(ultima['data_transacao']), ultima['id'])
+        
+        # Números das contas relacionadas em uma única consulta
+        ids_relacionados = {t['conta_origem_id'] for t in extrato_transacoes} | {t['conta_destino_id'] for t in extrato_transacoes}
+        ids_relacionados.discard(None)
+        numeros_conta = dict(
+            db.session.query(Conta.id, Conta.numero_conta).filter(Conta.id.in_(ids_relacionados)).all()
+        ) if ids_relacionados else {}
         
         # Processar transações para o extrato
-        extrato_transacoes = []
-        for transacao in transacoes:
-            transacao_dict = transacao.to_dict()
-            
+        for transacao_dict in extrato_transacoes:
             # Determinar se é entrada ou saída para esta conta
-            if transacao.conta_destino_id == conta_id:
+            if transacao_dict['conta_destino_id'] == conta_id:
                 transacao_dict['tipo_movimento'] = 'entrada'
-                transacao_dict['conta_relacionada'] = transacao.conta_origem.numero_conta if transacao.conta_origem else 'N/A'
+                transacao_dict['conta_relacionada'] = numeros_conta.get(transacao_dict['conta_origem_id'], 'N/A')
             else:
                 transacao_dict['tipo_movimento'] = 'saida'
-                transacao_dict['conta_relacionada'] = transacao.conta_destino.numero_conta if transacao.conta_destino else 'N/A'
+                transacao_dict['conta_relacionada'] = numeros_conta.get(transacao_dict['conta_destino_id'], 'N/A')
             
             # Destacar transações acima de R$ 5.000
-            transacao_dict['valor_alto'] = float(transacao.valor) > 5000.0
-            
-            extrato_transacoes.append(transacao_dict)
+            transacao_dict['valor_alto'] = transacao_dict['valor'] > 5000.0
         
         return jsonify({
             'conta': conta.to_dict(),
             'saldo_atual': float(conta.saldo),
             'transacoes': extrato_transacoes,
             'total_transacoes': len(extrato_transacoes),
+            'next_cursor': proximo_cursor,
             'periodo': {
                 'data_inicio': data_inicio,
                 'data_fim': data_fim
-            }
+            },
+            **({'totais': totais} if totais is not None else {})
         }), 200
         
     except Exception as e:
@@ -227,15 +592,77 @@ def obter_transacao(codigo_unico):
     """Obter detalhes de uma transação específica pelo código único"""
     try:
         transacao = Transacao.query.filter_by(codigo_unico=codigo_unico).first()
-        if not transacao:
+        if transacao:
+            transacao_dict = transacao.to_dict()
+        else:
+            # Transações de meses fechados ficam nas partições arquivadas
+            transacao_dict = arquivo_transacoes.transacao(codigo_unico)
+        if not transacao_dict:
             return jsonify({'erro': 'Transação não encontrada'}), 404
         
         return jsonify({
-            'transacao': transacao.to_dict()
+            'transacao': transacao_dict
         }), 200
     except Exception as e:
         return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
 
+@financial_bp.route('/contas/<int:conta_id>/eventos', methods=['GET'])
+def eventos_conta(conta_id):
+    """Stream (Server-Sent Events) das movimentações de saldo de uma conta"""
+    try:
+        conta = Conta.query.get(conta_id)
+        if not conta:
+            return jsonify({'erro': 'Conta não encontrada'}), 404
+
+        ultimo_id = request.headers.get('Last-Event-ID') or request.args.get('ultimo_evento')
+        if ultimo_id is not None:
+            try:
+                ultimo_id = int(ultimo_id)
+            except ValueError:
+                return jsonify({'erro': 'Last-Event-ID inválido'}), 400
+
+        # Assina antes de ler o histórico para não perder eventos entre os dois
+        fila = eventos.assinar(conta_id)
+        if ultimo_id is None:
+            pendentes = []
+            inicial = formatar_evento(None, 'saldo', json.dumps({'conta_id': conta.id, 'saldo_atual': float(conta.saldo)}))
+        else:
+            pendentes = [(e.id, e.tipo, e.dados) for e in eventos.eventos_desde(conta_id, ultimo_id)]
+            inicial = None
+        # Não segura a conexão do banco enquanto o stream estiver aberto
+        db.session.close()
+        heartbeat = eventos.app.config['EVENTOS_HEARTBEAT_SEGUNDOS']
+    except Exception as e:
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
+
+    def gerar():
+        enviado = ultimo_id or 0
+        try:
+            yield 'retry: 3000\n\n'
+            if inicial:
+                yield inicial
+            for evento_id, tipo, dados in pendentes:
+                enviado = evento_id
+                yield formatar_evento(evento_id, tipo, dados)
+            while True:
+                try:
+                    evento_id, tipo, dados = fila.get(timeout=heartbeat)
+                except queue.Empty:
+                    # Comentário SSE: mantém a conexão viva em proxies e detecta cliente desconectado
+                    yield ': heartbeat\n\n'
+                    continue
+                if evento_id <= enviado:
+                    continue
+                enviado = evento_id
+                yield formatar_evento(evento_id, tipo, dados)
+        finally:
+            eventos.cancelar(conta_id, fila)
+
+    return Response(stream_with_context(gerar()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @financial_bp.route('/deposito', methods=['POST'])
 def realizar_deposito():
     """Realizar depósito em uma conta"""
@@ -244,8 +671,14 @@ def realizar_deposito():
         
         if not data.get('conta_id') or not data.get('valor'):
             return jsonify({'erro': 'conta_id e valor são obrigatórios'}), 400
+        if not isinstance(data['conta_id'], (int, str)):
+            return jsonify({'erro': 'Campo conta_id inválido'}), 400
         
         valor = Decimal(str(data['valor']))
+        if not valor.is_finite():
+            return jsonify({'erro': 'Valor inválido'}), 400
+        # O valor é gravado arredondado ao centavo: valida e responde com o mesmo valor
+        valor = ao_centavo(valor)
         if valor <= 0:
             return jsonify({'erro': 'Valor deve ser maior que zero'}), 400
         
@@ -260,7 +693,7 @@ def realizar_deposito():
         codigo_unico = str(uuid.uuid4())
         
         # Atualizar saldo
-        conta.saldo += valor
+        conta.creditar(valor)
         
         # Registrar transação
         nova_transacao = Transacao(
@@ -273,7 +706,9 @@ def realizar_deposito():
         )
         
         db.session.add(nova_transacao)
+        registrar_eventos(nova_transacao, conta)
         db.session.commit()
+        eventos.notificar()
         
         return jsonify({
             'sucesso': True,
@@ -1,8 +1,14 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 from src.models.user import User, db
+from sqlalchemy import insert, update, or_
+from sqlalchemy.exc import IntegrityError
+import json
+import time
 
 user_bp = Blueprint('user', __name__)
 
+BATCH_SIZE = 1000
+
 @user_bp.route('/users', methods=['GET'])
 def get_users():
     users = User.query.all()
@@ -37,3 +43,150 @@ def delete_user(user_id):
     db.session.delete(user)
     db.session.commit()
     return '', 204
+
+def _read_ndjson(stream):
+    line_number = 0
+    for raw_line in stream:
+        if not raw_line.strip():
+            continue
+        line_number += 1
+        try:
+            yield line_number, json.loads(raw_line)
+        except ValueError:
+            yield line_number, None
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _plan_batch(batch):
+    """Split a batch into inserts, updates and conflicts with one lookup query"""
+    conflicts = []
+    rows = []
+    seen_usernames, seen_emails = set(), set()
+    for line, data in batch:
+        if not isinstance(data, dict) or not data.get('username') or not data.get('email'):
+            conflicts.append({'line': line, 'error': 'username and email are required'})
+        elif not isinstance(data['username'], str) or not isinstance(data['email'], str):
+            conflicts.append({'line': line, 'error': 'username and email must be strings'})
+        elif data['username'] in seen_usernames or data['email'] in seen_emails:
+            conflicts.append({'line': line, 'username': data['username'], 'error': 'duplicated in batch'})
+        else:
+            seen_usernames.add(data['username'])
+            seen_emails.add(data['email'])
+            rows.append((line, data['username'], data['email']))
+
+    existing = User.query.filter(or_(User.username.in_(seen_usernames), User.email.in_(seen_emails))).all() if rows else []
+    by_username = {user.username: user for user in existing}
+    by_email = {user.email: user for user in existing}
+
+    inserts, updates = [], []
+    # Existing user id -> line that already targets it; a second row for the
+    # same user would silently overwrite the first one's change
+    claimed = {}
+    for line, username, email in rows:
+        user_by_username = by_username.get(username)
+        user_by_email = by_email.get(email)
+        user = user_by_username or user_by_email
+        if user_by_username and user_by_email and user_by_username is not user_by_email:
+            conflicts.append({'line': line, 'username': username,
+                              'error': f'email already belongs to user {user_by_email.id}'})
+        elif user and user.id in claimed:
+            conflicts.append({'line': line, 'username': username,
+                              'error': f'user {user.id} already targeted by line {claimed[user.id]}'})
+        elif user:
+            claimed[user.id] = line
+            if user.username != username or user.email != email:
+                updates.append((line, {'id': user.id, 'username': username, 'email': email}))
+        else:
+            inserts.append((line, {'username': username, 'email': email}))
+    return inserts, updates, conflicts
+
+def _apply_batch(inserts, updates):
+    """Write a batch in one transaction; on a constraint error fall back to one savepoint per row"""
+    try:
+        if inserts:
+            db.session.execute(insert(User), [row for _, row in inserts])
+        if updates:
+            db.session.execute(update(User), [row for _, row in updates])
+        db.session.commit()
+        return len(inserts), len(updates), []
+    except IntegrityError:
+        db.session.rollback()
+
+    created, updated, conflicts = 0, 0, []
+    for statement, rows in ((insert(User), inserts), (update(User), updates)):
+        for line, row in rows:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(statement, [row])
+            except IntegrityError:
+                conflicts.append({'line': line, 'username': row['username'], 'error': 'username or email already in use'})
+                continue
+            if 'id' in row:
+                updated += 1
+            else:
+                created += 1
+    db.session.commit()
+    return created, updated, conflicts
+
+@user_bp.route('/users/import', methods=['POST'])
+def import_users():
+    """Upsert users by username/email from an NDJSON upload, reporting conflicts as they happen"""
+    batch_size = request.args.get('batch_size', BATCH_SIZE, type=int)
+    if batch_size < 1:
+        return jsonify({'error': 'batch_size must be at least 1'}), 400
+
+    def generate():
+        started = time.perf_counter()
+        summary = {'total': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'conflicts': 0}
+        try:
+            for batch in _batches(_read_ndjson(request.stream), batch_size):
+                inserts, updates, conflicts = _plan_batch(batch)
+                created, updated, write_conflicts = _apply_batch(inserts, updates)
+                conflicts += write_conflicts
+                summary['total'] += len(batch)
+                summary['created'] += created
+                summary['updated'] += updated
+                summary['conflicts'] += len(conflicts)
+                summary['unchanged'] = summary['total'] - summary['created'] - summary['updated'] - summary['conflicts']
+                for conflict in conflicts:
+                    yield json.dumps({'conflict': conflict}) + '\n'
+        except Exception as e:
+            # The 200 status is already sent: report the failure in the stream.
+            # Batches before this one stay committed and are in the summary.
+            db.session.rollback()
+            summary['aborted'] = True
+            yield json.dumps({'error': f'Internal error: {str(e)}'}) + '\n'
+
+        elapsed = time.perf_counter() - started
+        summary['seconds'] = round(elapsed, 3)
+        summary['rows_per_second'] = round(summary['total'] / elapsed, 1) if elapsed else None
+        yield json.dumps({'summary': summary}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@user_bp.route('/users/export', methods=['GET'])
+def export_users():
+    """Stream every user as NDJSON, paging by id so memory stays bounded"""
+    batch_size = request.args.get('batch_size', BATCH_SIZE, type=int)
+    if batch_size < 1:
+        return jsonify({'error': 'batch_size must be at least 1'}), 400
+
+    def generate():
+        last_id = 0
+        while True:
+            users = User.query.filter(User.id > last_id).order_by(User.id).limit(batch_size).all()
+            if not users:
+                break
+            yield ''.join(json.dumps(user.to_dict()) + '\n' for user in users)
+            last_id = users[-1].id
+            db.session.expunge_all()
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
@@ -0,0 +1,214 @@
+"""
+Controle de admissão para os endpoints que movimentam dinheiro.
+
+Antes de chegar às rotas, cada requisição consome tokens de baldes (token
+bucket) por cliente e, nas escritas, também pelas contas movimentadas; a conta
+de destino tem um orçamento de entrada próprio e maior. Leituras e escritas
+têm orçamentos separados, para que extratos continuem respondendo
+enquanto as escritas são limitadas. Além disso, o número de escritas em
+andamento é limitado, o que evita empilhar requisições na trava de escrita do
+SQLite; o excesso é recusado logo com 429 e Retry-After.
+
+O estado dos baldes fica em um arquivo SQLite local compartilhado por todos os
+workers do gunicorn. Se esse armazenamento falhar a requisição é admitida.
+"""
+
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from flask import g, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+ENDPOINTS_ESCRITA = {'financial.realizar_transferencia', 'financial.realizar_deposito'}
+
+
+class ArmazenamentoBaldes:
+    """Baldes de tokens e vagas de escrita em um arquivo SQLite compartilhado"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._local = threading.local()
+
+    def _conexao(self):
+        # Uma conexão por thread e por processo (os workers são criados por fork)
+        if getattr(self._local, 'pid', None) != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=5, isolation_level=None)
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('PRAGMA synchronous=NORMAL')
+            conexao.execute('CREATE TABLE IF NOT EXISTS baldes (chave TEXT PRIMARY KEY, tokens REAL NOT NULL, atualizado REAL NOT NULL)')
+            conexao.execute('CREATE TABLE IF NOT EXISTS escritas_em_andamento (id INTEGER PRIMARY KEY AUTOINCREMENT, expira REAL NOT NULL)')
+            self._local.conexao = conexao
+            self._local.pid = os.getpid()
+        return self._local.conexao
+
+    def consumir(self, baldes):
+        """
+        Consumir um token de cada balde `(chave, taxa por segundo, capacidade)`,
+        tudo ou nada. Devolve (admitido, segundos até haver token).
+        """
+        conexao = self._conexao()
+        agora = time.time()
+        conexao.execute('BEGIN IMMEDIATE')
+        try:
+            novos = []
+            espera = 0.0
+            for chave, taxa, capacidade in baldes:
+                linha = conexao.execute('SELECT tokens, atualizado FROM baldes WHERE chave = ?', (chave,)).fetchone()
+                tokens = capacidade if linha is None else min(capacidade, linha[0] + (agora - linha[1]) * taxa)
+                if tokens < 1:
+                    espera = max(espera, (1 - tokens) / taxa)
+                novos.append((chave, tokens - 1, agora))
+
+            if espera > 0:
+                conexao.execute('ROLLBACK')
+                return False, espera
+
+            conexao.executemany(
+                'INSERT INTO baldes (chave, tokens, atualizado) VALUES (?, ?, ?) '
+                'ON CONFLICT(chave) DO UPDATE SET tokens = excluded.tokens, atualizado = excluded.atualizado',
+                novos
+            )
+            conexao.execute('COMMIT')
+            return True, 0.0
+        except Exception:
+            conexao.execute('ROLLBACK')
+            raise
+
+    def reservar_escrita(self, limite, validade):
+        """Reservar uma vaga de escrita em andamento; None se todas estiverem ocupadas"""
+        conexao = self._conexao()
+        agora = time.time()
+        conexao.execute('BEGIN IMMEDIATE')
+        try:
+            # Vagas vencidas são de workers que morreram sem liberar
+            conexao.execute('DELETE FROM escritas_em_andamento WHERE expira < ?', (agora,))
+            ocupadas = conexao.execute('SELECT COUNT(*) FROM escritas_em_andamento').fetchone()[0]
+            if ocupadas >= limite:
+                conexao.execute('ROLLBACK')
+                return None
+            vaga = conexao.execute('INSERT INTO escritas_em_andamento (expira) VALUES (?)', (agora + validade,)).lastrowid
+            conexao.execute('COMMIT')
+            return vaga
+        except Exception:
+            conexao.execute('ROLLBACK')
+            raise
+
+    def liberar_escrita(self, vaga):
+        self._conexao().execute('DELETE FROM escritas_em_andamento WHERE id = ?', (vaga,))
+
+
+class Admissao:
+    """Limites de taxa e de concorrência aplicados em `before_request`"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.armazenamento = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        caminho_padrao = os.path.join(os.path.dirname(__file__), '..', 'database', 'admissao.db')
+        padroes = {
+            'ADMISSAO_HABILITADA': os.environ.get('ADMISSAO_HABILITADA', '1') == '1',
+            'ADMISSAO_DB': os.environ.get('ADMISSAO_DB', os.path.abspath(caminho_padrao)),
+            'ADMISSAO_PROXIES_CONFIAVEIS': int(os.environ.get('ADMISSAO_PROXIES_CONFIAVEIS', 0)),
+            # Escritas: tokens por segundo e capacidade do balde
+            'ADMISSAO_ESCRITA_CLIENTE_TAXA': float(os.environ.get('ADMISSAO_ESCRITA_CLIENTE_TAXA', 5)),
+            'ADMISSAO_ESCRITA_CLIENTE_CAPACIDADE': float(os.environ.get('ADMISSAO_ESCRITA_CLIENTE_CAPACIDADE', 20)),
+            # Por conta debitada (origem da transferência) ou depositada
+            'ADMISSAO_ESCRITA_CONTA_TAXA': float(os.environ.get('ADMISSAO_ESCRITA_CONTA_TAXA', 2)),
+            'ADMISSAO_ESCRITA_CONTA_CAPACIDADE': float(os.environ.get('ADMISSAO_ESCRITA_CONTA_CAPACIDADE', 10)),
+            # Por conta de destino: orçamento separado e maior, porque limita as
+            # transferências recebidas de todos os clientes juntos (uma conta
+            # que recebe pagamentos não pode ficar presa ao limite de 2/s)
+            'ADMISSAO_ENTRADA_CONTA_TAXA': float(os.environ.get('ADMISSAO_ENTRADA_CONTA_TAXA', 20)),
+            'ADMISSAO_ENTRADA_CONTA_CAPACIDADE': float(os.environ.get('ADMISSAO_ENTRADA_CONTA_CAPACIDADE', 100)),
+            # Leituras: orçamento próprio por cliente
+            'ADMISSAO_LEITURA_CLIENTE_TAXA': float(os.environ.get('ADMISSAO_LEITURA_CLIENTE_TAXA', 50)),
+            'ADMISSAO_LEITURA_CLIENTE_CAPACIDADE': float(os.environ.get('ADMISSAO_LEITURA_CLIENTE_CAPACIDADE', 100)),
+            # Escritas em andamento somando todos os workers
+            'ADMISSAO_ESCRITAS_SIMULTANEAS': int(os.environ.get('ADMISSAO_ESCRITAS_SIMULTANEAS', 8)),
+            'ADMISSAO_ESCRITA_VALIDADE_SEGUNDOS': 30,
+        }
+        for chave, valor in padroes.items():
+            app.config.setdefault(chave, valor)
+
+        self.app = app
+        self.armazenamento = ArmazenamentoBaldes(app.config['ADMISSAO_DB'])
+        app.extensions['admissao'] = self
+        app.before_request(self.admitir)
+        app.teardown_request(self.liberar)
+
+    def _cliente(self):
+        proxies = self.app.config['ADMISSAO_PROXIES_CONFIAVEIS']
+        if proxies and len(request.access_route) >= proxies:
+            return request.access_route[-proxies]
+        return request.remote_addr or 'desconhecido'
+
+    @staticmethod
+    def _recusar(mensagem, espera):
+        resposta = jsonify({'erro': mensagem})
+        resposta.headers['Retry-After'] = str(max(1, math.ceil(espera)))
+        return resposta, 429
+
+    def admitir(self):
+        config = self.app.config
+        # Preflight CORS não movimenta nada e não deve gastar tokens nem vagas
+        if not config['ADMISSAO_HABILITADA'] or request.method == 'OPTIONS':
+            return None
+
+        cliente = self._cliente()
+        if request.endpoint in ENDPOINTS_ESCRITA:
+            baldes = [(f'escrita:cliente:{cliente}', config['ADMISSAO_ESCRITA_CLIENTE_TAXA'],
+                       config['ADMISSAO_ESCRITA_CLIENTE_CAPACIDADE'])]
+            data = request.get_json(silent=True)
+            if isinstance(data, dict):
+                # Cada conta movimentada tem o seu balde: a origem e a do depósito
+                # no orçamento de escrita, o destino no de entrada. IDs de outro
+                # tipo (listas, objetos) ficam para a rota recusar com 400
+                for campo, prefixo, taxa, capacidade in (
+                    ('conta_origem_id', 'escrita', 'ADMISSAO_ESCRITA_CONTA_TAXA', 'ADMISSAO_ESCRITA_CONTA_CAPACIDADE'),
+                    ('conta_id', 'escrita', 'ADMISSAO_ESCRITA_CONTA_TAXA', 'ADMISSAO_ESCRITA_CONTA_CAPACIDADE'),
+                    ('conta_destino_id', 'entrada', 'ADMISSAO_ENTRADA_CONTA_TAXA', 'ADMISSAO_ENTRADA_CONTA_CAPACIDADE'),
+                ):
+                    conta_id = data.get(campo)
+                    if isinstance(conta_id, (int, str)):
+                        baldes.append((f'{prefixo}:conta:{conta_id}', config[taxa], config[capacidade]))
+        elif request.method in ('GET', 'HEAD') and request.path.startswith('/api/'):
+            baldes = [(f'leitura:cliente:{cliente}', config['ADMISSAO_LEITURA_CLIENTE_TAXA'],
+                       config['ADMISSAO_LEITURA_CLIENTE_CAPACIDADE'])]
+        else:
+            return None
+
+        try:
+            admitido, espera = self.armazenamento.consumir(baldes)
+            if not admitido:
+                return self._recusar('Limite de requisições excedido, tente novamente em instantes', espera)
+
+            if request.endpoint in ENDPOINTS_ESCRITA:
+                vaga = self.armazenamento.reservar_escrita(
+                    config['ADMISSAO_ESCRITAS_SIMULTANEAS'], config['ADMISSAO_ESCRITA_VALIDADE_SEGUNDOS']
+                )
+                if vaga is None:
+                    return self._recusar('Muitas operações em andamento, tente novamente em instantes', 1)
+                g.admissao_vaga = vaga
+        except sqlite3.Error:
+            logger.exception('Falha no controle de admissão; requisição admitida')
+        return None
+
+    def liberar(self, erro=None):
+        vaga = g.pop('admissao_vaga', None)
+        if vaga is None:
+            return
+        try:
+            self.armazenamento.liberar_escrita(vaga)
+        except sqlite3.Error:
+            logger.exception('Falha ao liberar vaga de escrita %s', vaga)
+
+
+admissao = Admissao()
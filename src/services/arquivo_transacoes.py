@@ -0,0 +1,341 @@
+"""
+Arquivamento do razão em partições mensais.
+
+Meses fechados (mais antigos que a janela de retenção) saem da tabela
+`transacoes` e vão para um arquivo SQLite por mês no diretório de arquivo. O
+catálogo `particoes_arquivo` registra cada mês arquivado e `resumo_arquivo`
+guarda os totais por conta, usados pela reconciliação.
+
+As consultas de extrato e de transação leem a tabela quente e as partições
+arquivadas de forma transparente; só são abertas as partições cujo mês cruza o
+período pedido, e o gerenciador mantém um número limitado de arquivos abertos.
+"""
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from src.models.financial import db, Transacao, ParticaoArquivo, IndiceArquivo
+from src.models.dinheiro import DINHEIRO_EM_CENTAVOS, MODO_DINHEIRO, sql_centavos
+
+COLUNAS = 'id, codigo_unico, conta_origem_id, conta_destino_id, tipo, valor, descricao, data_transacao, status'
+
+DDL_PARTICAO = """
+    CREATE TABLE IF NOT EXISTS transacoes (
+        id INTEGER NOT NULL PRIMARY KEY,
+        codigo_unico VARCHAR(36) NOT NULL UNIQUE,
+        conta_origem_id INTEGER,
+        conta_destino_id INTEGER,
+        tipo VARCHAR(20) NOT NULL,
+        valor NUMERIC(15, 2) NOT NULL,
+        descricao VARCHAR(200),
+        data_transacao DATETIME,
+        status VARCHAR(20)
+    );
+    CREATE INDEX IF NOT EXISTS ix_transacoes_origem_data ON transacoes (conta_origem_id, data_transacao, id);
+    CREATE INDEX IF NOT EXISTS ix_transacoes_destino_data ON transacoes (conta_destino_id, data_transacao, id);
+    CREATE TABLE IF NOT EXISTS metadados (chave TEXT NOT NULL PRIMARY KEY, valor TEXT NOT NULL);
+"""
+
+
+def _texto_data(data):
+    # Mesmo formato em que o SQLAlchemy grava DateTime no SQLite
+    return data.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def _inicio_mes_seguinte(data):
+    return (data.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def linha_para_dict(linha):
+    """Converter uma linha de partição arquivada no formato de `Transacao.to_dict`"""
+    id_, codigo_unico, conta_origem_id, conta_destino_id, tipo, valor, descricao, data_transacao, status = linha
+    return {
+        'id': id_,
+        'codigo_unico': codigo_unico,
+        'conta_origem_id': conta_origem_id,
+        'conta_destino_id': conta_destino_id,
+        'tipo': tipo,
+        'valor': valor / 100 if DINHEIRO_EM_CENTAVOS else float(valor),
+        'descricao': descricao,
+        'data_transacao': datetime.fromisoformat(data_transacao).isoformat(),
+        'status': status,
+        'arquivada': True
+    }
+
+
+class GerenciadorArquivos:
+    """Mantém conexões somente leitura com as partições, limitadas por LRU"""
+
+    def __init__(self, max_abertos=8):
+        self.max_abertos = max_abertos
+        self._conexoes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _conexao(self, caminho):
+        conexao = self._conexoes.pop(caminho, None)
+        if conexao is None:
+            conexao = sqlite3.connect(f'file:{caminho}?mode=ro', uri=True, check_same_thread=False)
+            while len(self._conexoes) >= self.max_abertos:
+                _, antiga = self._conexoes.popitem(last=False)
+                antiga.close()
+        self._conexoes[caminho] = conexao
+        return conexao
+
+    def consultar(self, caminho, sql, parametros=()):
+        with self._lock:
+            return self._conexao(caminho).execute(sql, parametros).fetchall()
+
+    def fechar(self, caminho=None):
+        """Fechar uma partição (ou todas), por exemplo antes de mover o arquivo"""
+        with self._lock:
+            caminhos = [caminho] if caminho else list(self._conexoes)
+            for item in caminhos:
+                conexao = self._conexoes.pop(item, None)
+                if conexao is not None:
+                    conexao.close()
+
+
+class ArquivoTransacoes:
+    """Arquivamento e leitura das partições mensais de transações"""
+
+    def __init__(self, app=None):
+        self.gerenciador = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        diretorio_padrao = os.path.join(os.path.dirname(__file__), '..', 'database', 'arquivo')
+        app.config.setdefault('ARQUIVO_TRANSACOES_DIR', os.environ.get('ARQUIVO_TRANSACOES_DIR', os.path.abspath(diretorio_padrao)))
+        app.config.setdefault('ARQUIVO_TRANSACOES_RETENCAO_DIAS', int(os.environ.get('ARQUIVO_TRANSACOES_RETENCAO_DIAS', 90)))
+        app.config.setdefault('ARQUIVO_TRANSACOES_MAX_ABERTOS', int(os.environ.get('ARQUIVO_TRANSACOES_MAX_ABERTOS', 8)))
+        self.gerenciador = GerenciadorArquivos(app.config['ARQUIVO_TRANSACOES_MAX_ABERTOS'])
+        app.extensions['arquivo_transacoes'] = self
+
+    def _caminho(self, particao):
+        return os.path.join(current_app.config['ARQUIVO_TRANSACOES_DIR'], particao.arquivo)
+
+    # Arquivamento
+
+    def meses_arquivaveis(self):
+        """Meses fechados, fora da janela de retenção, que ainda têm transações na tabela quente"""
+        limite = datetime.utcnow() - timedelta(days=current_app.config['ARQUIVO_TRANSACOES_RETENCAO_DIAS'])
+        mais_antiga = db.session.query(db.func.min(Transacao.data_transacao)).scalar()
+        meses = []
+        if mais_antiga is None:
+            return meses
+        inicio = mais_antiga.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        while _inicio_mes_seguinte(inicio) <= limite:
+            meses.append(inicio)
+            inicio = _inicio_mes_seguinte(inicio)
+        return meses
+
+    def arquivar_mes(self, inicio):
+        """
+        Mover as transações de um mês para a sua partição. Transações pendentes
+        continuam na tabela quente até serem liquidadas. Devolve quantas
+        transações foram movidas.
+
+        A transação de maior ID também fica na tabela quente: `transacoes` não
+        usa AUTOINCREMENT e, sem ela, o SQLite voltaria a entregar IDs já
+        usados, quebrando o checkpoint da reconciliação incremental. Ela é
+        arquivada numa execução seguinte, quando já houver transações mais novas.
+        """
+        inicio = inicio.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        fim = _inicio_mes_seguinte(inicio)
+        mes = inicio.strftime('%Y-%m')
+
+        pendentes = Transacao.status == 'pendente'
+        a_mover = db.session.query(db.func.count(Transacao.id)).filter(
+            Transacao.data_transacao >= inicio, Transacao.data_transacao < fim, ~pendentes,
+            Transacao.id < db.session.query(db.func.max(Transacao.id)).scalar_subquery()
+        ).scalar()
+        if not a_mover:
+            return 0
+
+        nome_arquivo = f"transacoes_{inicio.strftime('%Y_%m')}.db"
+        os.makedirs(current_app.config['ARQUIVO_TRANSACOES_DIR'], exist_ok=True)
+        caminho = os.path.join(current_app.config['ARQUIVO_TRANSACOES_DIR'], nome_arquivo)
+        self.gerenciador.fechar(caminho)
+        with sqlite3.connect(caminho) as arquivo:
+            arquivo.executescript(DDL_PARTICAO)
+            # Os valores são copiados como estão, no modo de dinheiro do banco principal
+            arquivo.execute("INSERT OR REPLACE INTO metadados (chave, valor) VALUES ('modo_dinheiro', ?)", (MODO_DINHEIRO,))
+
+        filtro = "data_transacao >= ? AND data_transacao < ? AND status != 'pendente' AND id < ?"
+        agora = _texto_data(datetime.utcnow())
+
+        # Cópia, resumo, catálogo e remoção da tabela quente na mesma transação
+        conexao = db.engine.raw_connection()
+        try:
+            cursor = conexao.cursor()
+            cursor.execute('ATTACH DATABASE ? AS arquivo', (caminho,))
+            try:
+                # Lido uma vez: transações gravadas durante o arquivamento têm ID
+                # maior e ficam fora de todos os comandos abaixo
+                maior_id = cursor.execute('SELECT MAX(id) FROM main.transacoes').fetchone()[0]
+                parametros = (_texto_data(inicio), _texto_data(fim), maior_id)
+                cursor.execute(f'INSERT INTO arquivo.transacoes ({COLUNAS}) '
+                               f'SELECT {COLUNAS} FROM main.transacoes WHERE {filtro}', parametros)
+                movidas = cursor.rowcount
+                cursor.execute(f"""
+                    INSERT INTO resumo_arquivo (mes, conta_id, entradas_centavos, saidas_centavos)
+                    SELECT ?, conta_id, SUM(entradas), SUM(saidas) FROM (
+                        SELECT conta_destino_id AS conta_id, {sql_centavos('valor')} AS entradas, 0 AS saidas
+                        FROM main.transacoes
+                        WHERE {filtro} AND status = 'concluida' AND conta_destino_id IS NOT NULL
+                        UNION ALL
+                        SELECT conta_origem_id, 0, {sql_centavos('valor')}
+                        FROM main.transacoes
+                        WHERE {filtro} AND status = 'concluida' AND conta_origem_id IS NOT NULL
+                    ) GROUP BY conta_id
+                """, (mes,) + parametros + parametros)
+                cursor.execute(f'INSERT INTO indice_arquivo (codigo_unico, mes) '
+                               f'SELECT codigo_unico, ? FROM main.transacoes WHERE {filtro}', (mes,) + parametros)
+                cursor.execute(f'DELETE FROM main.transacoes WHERE {filtro}', parametros)
+
+                total = cursor.execute('SELECT COUNT(*) FROM arquivo.transacoes').fetchone()[0]
+                existente = cursor.execute('SELECT id FROM particoes_arquivo WHERE mes = ?', (mes,)).fetchone()
+                if existente:
+                    cursor.execute('UPDATE particoes_arquivo SET total_transacoes = ?, arquivado_em = ? WHERE id = ?',
+                                   (total, agora, existente[0]))
+                else:
+                    cursor.execute('INSERT INTO particoes_arquivo (mes, arquivo, inicio, fim, total_transacoes, arquivado_em) '
+                                   'VALUES (?, ?, ?, ?, ?, ?)',
+                                   (mes, nome_arquivo, _texto_data(inicio), _texto_data(fim), total, agora))
+                conexao.commit()
+            except Exception:
+                conexao.rollback()
+                raise
+            finally:
+                cursor.execute('DETACH DATABASE arquivo')
+        finally:
+            conexao.close()
+        return movidas
+
+    # Leitura
+
+    def particoes(self, data_inicio=None, data_fim=None):
+        """Partições que cruzam o período, da mais recente para a mais antiga"""
+        query = ParticaoArquivo.query
+        if data_inicio:
+            query = query.filter(ParticaoArquivo.fim > data_inicio)
+        if data_fim:
+            query = query.filter(ParticaoArquivo.inicio <= data_fim)
+        return query.order_by(ParticaoArquivo.inicio.desc()).all()
+
+    def transacoes_conta(self, conta_id, data_inicio=None, data_fim=None, limite=10, corte=None, posicao=None):
+        """
+        Transações arquivadas de uma conta, ordenadas por (data, id)
+        decrescentes. `corte` é a data da transação mais antiga que já entraria
+        no resultado: partições inteiramente anteriores a ela não são abertas.
+        `posicao` é o (data, id) do cursor de paginação.
+        """
+        filtros = []
+        parametros = []
+        if data_inicio:
+            filtros.append('data_transacao >= ?')
+            parametros.append(_texto_data(data_inicio))
+        if data_fim:
+            filtros.append('data_transacao <= ?')
+            parametros.append(_texto_data(data_fim))
+        if posicao:
+            filtros.append('(data_transacao, id) < (?, ?)')
+            parametros.extend([_texto_data(posicao[0]), posicao[1]])
+        condicao = ''.join(f' AND {filtro}' for filtro in filtros)
+        # Uma varredura limitada em cada índice (conta, data, id); o UNION
+        # remove a duplicata de transferências da conta para ela mesma
+        sql = (f'SELECT {COLUNAS} FROM (SELECT {COLUNAS} FROM transacoes WHERE conta_origem_id = ?{condicao} '
+               'ORDER BY data_transacao DESC, id DESC LIMIT ?) '
+               f'UNION SELECT {COLUNAS} FROM (SELECT {COLUNAS} FROM transacoes WHERE conta_destino_id = ?{condicao} '
+               'ORDER BY data_transacao DESC, id DESC LIMIT ?) '
+               'ORDER BY data_transacao DESC, id DESC LIMIT ?')
+
+        resultado = []
+        for particao in self.particoes(data_inicio, data_fim):
+            if len(resultado) >= limite:
+                break
+            if corte is not None and particao.fim <= corte:
+                break
+            if posicao is not None and particao.inicio > posicao[0]:
+                # Partição inteira mais nova que o cursor
+                continue
+            restante = limite - len(resultado)
+            linhas = self.gerenciador.consultar(
+                self._caminho(particao), sql,
+                [conta_id] + parametros + [restante] + [conta_id] + parametros + [restante, restante]
+            )
+            resultado.extend(linha_para_dict(linha) for linha in linhas)
+        return resultado
+
+    def totais_conta(self, conta_id, data_inicio=None, data_fim=None, formato_periodo=None):
+        """
+        Entradas, saídas (em centavos) e quantidade das transações concluídas
+        arquivadas, por período `strftime(formato_periodo)` ou num único grupo.
+        Devolve {periodo: [entradas, saidas, quantidade]}.
+        """
+        periodo = 'strftime(?, data_transacao)' if formato_periodo else 'NULL'
+        parametros = ([formato_periodo] if formato_periodo else []) + [conta_id, conta_id, conta_id, conta_id]
+        filtros = ["(conta_origem_id = ? OR conta_destino_id = ?)", "status = 'concluida'"]
+        if data_inicio:
+            filtros.append('data_transacao >= ?')
+            parametros.append(_texto_data(data_inicio))
+        if data_fim:
+            filtros.append('data_transacao <= ?')
+            parametros.append(_texto_data(data_fim))
+        sql = (f'SELECT {periodo} AS periodo, '
+               f"SUM(CASE WHEN conta_destino_id = ? THEN {sql_centavos('valor')} ELSE 0 END), "
+               f"SUM(CASE WHEN conta_origem_id = ? THEN {sql_centavos('valor')} ELSE 0 END), "
+               f"COUNT(*) FROM transacoes WHERE {' AND '.join(filtros)} GROUP BY periodo")
+
+        totais = {}
+        for particao in self.particoes(data_inicio, data_fim):
+            for chave, entradas, saidas, quantidade in self.gerenciador.consultar(self._caminho(particao), sql, parametros):
+                acumulado = totais.setdefault(chave, [0, 0, 0])
+                acumulado[0] += entradas or 0
+                acumulado[1] += saidas or 0
+                acumulado[2] += quantidade
+        return totais
+
+    def _nao_indexadas(self):
+        """Partições arquivadas antes do `indice_arquivo`, ainda sem códigos no índice"""
+        indexada = db.session.query(IndiceArquivo.codigo_unico).filter(IndiceArquivo.mes == ParticaoArquivo.mes).exists()
+        return ParticaoArquivo.query.filter(~indexada).order_by(ParticaoArquivo.inicio.desc()).all()
+
+    def indexar_particoes(self):
+        """Preencher o `indice_arquivo` das partições antigas; devolve quantos códigos foram indexados"""
+        total = 0
+        for particao in self._nao_indexadas():
+            with sqlite3.connect(f'file:{self._caminho(particao)}?mode=ro', uri=True) as arquivo:
+                codigos = arquivo.execute('SELECT codigo_unico FROM transacoes').fetchall()
+            db.session.execute(
+                db.insert(IndiceArquivo),
+                [{'codigo_unico': codigo, 'mes': particao.mes} for (codigo,) in codigos]
+            )
+            db.session.commit()
+            total += len(codigos)
+        return total
+
+    def transacao(self, codigo_unico):
+        """Procurar uma transação arquivada pelo código único, abrindo só a partição dela"""
+        indice = db.session.get(IndiceArquivo, codigo_unico)
+        if indice is not None:
+            particoes = ParticaoArquivo.query.filter_by(mes=indice.mes).all()
+        else:
+            # Normalmente vazio: só partições de antes do índice ainda não preenchidas
+            particoes = self._nao_indexadas()
+        for particao in particoes:
+            linhas = self.gerenciador.consultar(
+                self._caminho(particao),
+                f'SELECT {COLUNAS} FROM transacoes WHERE codigo_unico = ?',
+                (codigo_unico,)
+            )
+            if linhas:
+                return linha_para_dict(linhas[0])
+        return None
+
+
+arquivo_transacoes = ArquivoTransacoes()
@@ -0,0 +1,124 @@
+"""
+Compressão das respostas da aplicação.
+
+Respostas acima de `COMPRESSAO_TAMANHO_MINIMO` bytes são comprimidas com brotli
+(se o pacote estiver instalado) ou gzip, conforme o Accept-Encoding do
+cliente. Respostas em streaming são comprimidas bloco a bloco, sem juntar o
+corpo em memória. Conteúdo que já vem comprimido é deixado como está.
+"""
+
+import gzip
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from flask import request
+
+TIPOS_IGNORADOS = ('image/', 'video/', 'audio/', 'font/woff', 'application/zip', 'application/gzip',
+                   'application/x-gzip', 'application/octet-stream', 'text/event-stream')
+TIPOS_IMAGEM_TEXTO = ('image/svg+xml',)
+
+
+def _gerar_gzip(iteravel, nivel):
+    compressor = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    try:
+        for bloco in iteravel:
+            if isinstance(bloco, str):
+                bloco = bloco.encode('utf-8')
+            dados = compressor.compress(bloco)
+            # Z_SYNC_FLUSH entrega cada bloco ao cliente sem esperar o fim do stream
+            dados += compressor.flush(zlib.Z_SYNC_FLUSH)
+            if dados:
+                yield dados
+        yield compressor.flush()
+    finally:
+        if hasattr(iteravel, 'close'):
+            iteravel.close()
+
+
+def _gerar_brotli(iteravel, nivel):
+    compressor = brotli.Compressor(quality=nivel)
+    try:
+        for bloco in iteravel:
+            if isinstance(bloco, str):
+                bloco = bloco.encode('utf-8')
+            dados = compressor.process(bloco) + compressor.flush()
+            if dados:
+                yield dados
+        yield compressor.finish()
+    finally:
+        if hasattr(iteravel, 'close'):
+            iteravel.close()
+
+
+class Compressao:
+    """Middleware de compressão registrado como `after_request`"""
+
+    def __init__(self, app=None):
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESSAO_HABILITADA', os.environ.get('COMPRESSAO_HABILITADA', '1') == '1')
+        app.config.setdefault('COMPRESSAO_TAMANHO_MINIMO', int(os.environ.get('COMPRESSAO_TAMANHO_MINIMO', 1024)))
+        app.config.setdefault('COMPRESSAO_NIVEL_GZIP', int(os.environ.get('COMPRESSAO_NIVEL_GZIP', 6)))
+        app.config.setdefault('COMPRESSAO_NIVEL_BROTLI', int(os.environ.get('COMPRESSAO_NIVEL_BROTLI', 4)))
+        self.app = app
+        app.extensions['compressao'] = self
+        app.after_request(self.comprimir)
+
+    def _codificacao(self):
+        if brotli is not None and request.accept_encodings['br']:
+            return 'br'
+        if request.accept_encodings['gzip']:
+            return 'gzip'
+        return None
+
+    def _deve_comprimir(self, resposta):
+        if not self.app.config['COMPRESSAO_HABILITADA']:
+            return False
+        if resposta.status_code < 200 or resposta.status_code in (204, 206, 304):
+            return False
+        if 'Content-Encoding' in resposta.headers or resposta.direct_passthrough:
+            return False
+        mimetype = resposta.mimetype or ''
+        if mimetype.startswith(TIPOS_IGNORADOS) and mimetype not in TIPOS_IMAGEM_TEXTO:
+            return False
+        return True
+
+    def comprimir(self, resposta):
+        if not self._deve_comprimir(resposta):
+            return resposta
+        codificacao = self._codificacao()
+        if codificacao is None:
+            return resposta
+        config = self.app.config
+
+        if resposta.is_streamed:
+            nivel = config['COMPRESSAO_NIVEL_BROTLI'] if codificacao == 'br' else config['COMPRESSAO_NIVEL_GZIP']
+            gerador = _gerar_brotli if codificacao == 'br' else _gerar_gzip
+            resposta.response = gerador(resposta.response, nivel)
+            resposta.headers.pop('Content-Length', None)
+        else:
+            dados = resposta.get_data()
+            if len(dados) < config['COMPRESSAO_TAMANHO_MINIMO']:
+                return resposta
+            if codificacao == 'br':
+                resposta.set_data(brotli.compress(dados, quality=config['COMPRESSAO_NIVEL_BROTLI']))
+            else:
+                resposta.set_data(gzip.compress(dados, compresslevel=config['COMPRESSAO_NIVEL_GZIP'], mtime=0))
+
+        resposta.headers['Content-Encoding'] = codificacao
+        resposta.vary.add('Accept-Encoding')
+        etag, fraca = resposta.get_etag()
+        if etag:
+            resposta.set_etag(f'{etag}-{codificacao}', weak=fraca)
+        return resposta
+
+
+compressao = Compressao()
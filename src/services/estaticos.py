@@ -0,0 +1,164 @@
+"""
+Camada de arquivos estáticos do frontend.
+
+Na inicialização monta um manifesto em memória de `src/static` com o conteúdo
+de cada arquivo, as variantes pré-comprimidas (gzip e, se o pacote `brotli`
+estiver instalado, br) e um ETag forte por variante. As requisições são
+respondidas direto da memória, sem chamadas ao sistema de arquivos.
+
+Com `ESTATICOS_NOMES_COM_HASH` ligado, cada asset também fica disponível como
+`nome.<hash>.ext` (cache imutável de um ano) e as referências no index.html
+são reescritas para esses nomes.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import Response, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+INDEX = 'index.html'
+TAMANHO_MINIMO_COMPRESSAO = 256
+TIPOS_JA_COMPRIMIDOS = ('image/png', 'image/jpeg', 'image/gif', 'image/webp', 'font/woff', 'font/woff2',
+                        'application/zip', 'application/gzip', 'video/', 'audio/')
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+
+
+class ArquivoEstatico:
+    """Um arquivo do manifesto com as suas variantes de codificação"""
+
+    def __init__(self, nome, conteudo, cache_control):
+        self.nome = nome
+        self.mimetype = mimetypes.guess_type(nome)[0] or 'application/octet-stream'
+        self.cache_control = cache_control
+        self.hash = hashlib.sha256(conteudo).hexdigest()
+        self.variantes = {'identity': conteudo}
+
+        if len(conteudo) >= TAMANHO_MINIMO_COMPRESSAO and not self.mimetype.startswith(TIPOS_JA_COMPRIMIDOS):
+            comprimido = gzip.compress(conteudo, compresslevel=9, mtime=0)
+            if len(comprimido) < len(conteudo):
+                self.variantes['gzip'] = comprimido
+            if brotli is not None:
+                comprimido = brotli.compress(conteudo, quality=11)
+                if len(comprimido) < len(conteudo):
+                    self.variantes['br'] = comprimido
+
+    def etag(self, codificacao):
+        return f'{self.hash[:32]}-{codificacao}'
+
+
+class Estaticos:
+    """Manifesto em memória e resposta dos arquivos estáticos"""
+
+    def __init__(self, app=None):
+        self.pasta = None
+        self.manifesto = {}
+        self.grandes = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ESTATICOS_MAX_AGE', int(os.environ.get('ESTATICOS_MAX_AGE', 86400)))
+        app.config.setdefault('ESTATICOS_NOMES_COM_HASH', os.environ.get('ESTATICOS_NOMES_COM_HASH', '0') == '1')
+        app.config.setdefault('ESTATICOS_TAMANHO_MAXIMO', 5 * 1024 * 1024)
+        self.pasta = app.static_folder
+        app.extensions['estaticos'] = self
+        self.carregar(app.config)
+
+    def carregar(self, config):
+        """(Re)montar o manifesto a partir da pasta de estáticos"""
+        manifesto = {}
+        grandes = set()
+        if not self.pasta or not os.path.isdir(self.pasta):
+            self.manifesto = manifesto
+            self.grandes = grandes
+            return
+
+        cache_assets = f"public, max-age={config['ESTATICOS_MAX_AGE']}"
+        conteudos = {}
+        for raiz, _, arquivos in os.walk(self.pasta):
+            for nome_arquivo in arquivos:
+                caminho = os.path.join(raiz, nome_arquivo)
+                nome = os.path.relpath(caminho, self.pasta).replace(os.sep, '/')
+                if os.path.getsize(caminho) > config['ESTATICOS_TAMANHO_MAXIMO']:
+                    grandes.add(nome)
+                    continue
+                with open(caminho, 'rb') as arquivo:
+                    conteudos[nome] = arquivo.read()
+
+        nomes_com_hash = {}
+        for nome, conteudo in conteudos.items():
+            if nome == INDEX:
+                continue
+            manifesto[nome] = ArquivoEstatico(nome, conteudo, cache_assets)
+            if config['ESTATICOS_NOMES_COM_HASH']:
+                base, extensao = os.path.splitext(nome)
+                nome_hash = f'{base}.{manifesto[nome].hash[:10]}{extensao}'
+                manifesto[nome_hash] = ArquivoEstatico(nome_hash, conteudo, CACHE_IMUTAVEL)
+                nomes_com_hash[nome] = nome_hash
+
+        if INDEX in conteudos:
+            conteudo = conteudos[INDEX]
+            if nomes_com_hash:
+                conteudo = self._reescrever_referencias(conteudo, nomes_com_hash)
+            # O index.html é o ponto de entrada da SPA: sempre revalidado pelo ETag
+            manifesto[INDEX] = ArquivoEstatico(INDEX, conteudo, 'no-cache')
+
+        self.manifesto = manifesto
+        self.grandes = grandes
+
+    @staticmethod
+    def _reescrever_referencias(conteudo, nomes_com_hash):
+        html = conteudo.decode('utf-8')
+        for nome, nome_hash in nomes_com_hash.items():
+            html = re.sub(
+                rf'''((?:src|href)=["'])(/?){re.escape(nome)}(["'])''',
+                lambda m: f'{m.group(1)}{m.group(2)}{nome_hash}{m.group(3)}',
+                html
+            )
+        return html.encode('utf-8')
+
+    def _codificacao(self, arquivo):
+        """Melhor variante aceita pelo cliente conforme o Accept-Encoding"""
+        for codificacao in ('br', 'gzip'):
+            if codificacao in arquivo.variantes and request.accept_encodings[codificacao]:
+                return codificacao
+        return 'identity'
+
+    def responder(self, arquivo):
+        codificacao = self._codificacao(arquivo)
+        etag = arquivo.etag(codificacao)
+
+        if request.if_none_match.contains(etag):
+            resposta = Response(status=304)
+        else:
+            resposta = Response(arquivo.variantes[codificacao], mimetype=arquivo.mimetype)
+            if codificacao != 'identity':
+                resposta.headers['Content-Encoding'] = codificacao
+
+        resposta.set_etag(etag)
+        resposta.headers['Cache-Control'] = arquivo.cache_control
+        resposta.vary.add('Accept-Encoding')
+        return resposta
+
+    def servir(self, path):
+        """Servir um arquivo do manifesto, caindo no index.html para rotas da SPA"""
+        if path in self.grandes:
+            # Arquivos grandes demais para o manifesto saem direto do disco
+            return send_from_directory(self.pasta, path)
+        arquivo = self.manifesto.get(path) if path else None
+        if arquivo is None:
+            arquivo = self.manifesto.get(INDEX)
+        if arquivo is None:
+            return "index.html not found", 404
+        return self.responder(arquivo)
+
+
+estaticos = Estaticos()
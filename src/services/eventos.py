@@ -0,0 +1,162 @@
+"""
+Eventos de movimentação por conta (Server-Sent Events).
+
+As rotas de escrita gravam os eventos na tabela `eventos_conta` (outbox) na
+mesma transação que altera o saldo. Em cada processo, uma thread lê o outbox e
+entrega os eventos novos aos assinantes locais; assim uma transferência feita
+em um worker do gunicorn chega aos streams abertos em qualquer outro. A mesma
+thread apaga os eventos fora da janela de retenção, haja ou não assinantes. O id do outbox é o id do evento SSE, o que permite retomar o
+stream pelo `Last-Event-ID`.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+from src.models.financial import db, EventoConta
+
+logger = logging.getLogger(__name__)
+
+
+def registrar_eventos(transacao, *contas):
+    """
+    Adicionar à sessão um evento para cada conta afetada pela transação. Deve
+    ser chamado antes do commit da movimentação.
+    """
+    db.session.flush()
+    transacao_dict = transacao.to_dict()
+    for conta in contas:
+        if conta is None:
+            continue
+        dados = {
+            'conta_id': conta.id,
+            'saldo_atual': float(conta.saldo),
+            'tipo_movimento': 'entrada' if transacao.conta_destino_id == conta.id else 'saida',
+            'transacao': transacao_dict
+        }
+        db.session.add(EventoConta(conta_id=conta.id, tipo='transacao', dados=json.dumps(dados)))
+
+
+def formatar_evento(evento_id, tipo, dados):
+    """Quadro SSE; sem `evento_id` o cliente mantém o último Last-Event-ID"""
+    linha_id = f'id: {evento_id}\n' if evento_id is not None else ''
+    return f'{linha_id}event: {tipo}\ndata: {dados}\n\n'
+
+
+class Eventos:
+    """Pub/sub em processo alimentado pelo outbox `eventos_conta`"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._assinantes = {}
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('EVENTOS_INTERVALO_SEGUNDOS', float(os.environ.get('EVENTOS_INTERVALO_SEGUNDOS', 0.5)))
+        app.config.setdefault('EVENTOS_HEARTBEAT_SEGUNDOS', float(os.environ.get('EVENTOS_HEARTBEAT_SEGUNDOS', 15)))
+        app.config.setdefault('EVENTOS_RETENCAO_HORAS', int(os.environ.get('EVENTOS_RETENCAO_HORAS', 24)))
+        self.app = app
+        app.extensions['eventos'] = self
+        # Iniciada no primeiro request de cada processo, como a fila de
+        # transferências, para que a limpeza do outbox rode mesmo sem streams abertos
+        app.before_request(self._iniciar)
+
+    def notificar(self):
+        """Acordar a leitura do outbox logo após um commit neste processo"""
+        self._despertar.set()
+
+    def assinar(self, conta_id):
+        self._iniciar()
+        fila = queue.Queue(maxsize=1000)
+        with self._lock:
+            self._assinantes.setdefault(conta_id, set()).add(fila)
+        return fila
+
+    def cancelar(self, conta_id, fila):
+        with self._lock:
+            filas = self._assinantes.get(conta_id)
+            if filas:
+                filas.discard(fila)
+                if not filas:
+                    del self._assinantes[conta_id]
+
+    def eventos_desde(self, conta_id, ultimo_id, limite=1000):
+        """Eventos da conta depois de `ultimo_id`, para retomar um stream"""
+        return EventoConta.query.filter(
+            EventoConta.conta_id == conta_id, EventoConta.id > ultimo_id
+        ).order_by(EventoConta.id).limit(limite).all()
+
+    def _iniciar(self):
+        # Uma thread de leitura e limpeza do outbox por processo
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._assinantes = {}
+            with self.app.app_context():
+                self._ultimo_id = db.session.query(db.func.max(EventoConta.id)).scalar() or 0
+            threading.Thread(target=self._executar, name='eventos-outbox', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _executar(self):
+        ultima_limpeza = 0
+        while True:
+            self._despertar.wait(self.app.config['EVENTOS_INTERVALO_SEGUNDOS'])
+            self._despertar.clear()
+            with self.app.app_context():
+                try:
+                    self._distribuir()
+                    if time.monotonic() - ultima_limpeza > 600:
+                        self._limpar()
+                        ultima_limpeza = time.monotonic()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception('Erro ao ler o outbox de eventos')
+
+    def _distribuir(self):
+        # Sem assinantes só avança a posição, sem ler os eventos. O maior id é
+        # lido antes de conferir os assinantes: eventos gravados depois de um
+        # cliente assinar continuam sendo entregues
+        maior_id = db.session.query(db.func.max(EventoConta.id)).scalar() or 0
+        with self._lock:
+            if not self._assinantes:
+                self._ultimo_id = max(self._ultimo_id, maior_id)
+                return
+        while True:
+            eventos = EventoConta.query.filter(EventoConta.id > self._ultimo_id).order_by(EventoConta.id).limit(500).all()
+            if not eventos:
+                return
+            with self._lock:
+                for evento in eventos:
+                    for fila in self._assinantes.get(evento.conta_id, ()):
+                        try:
+                            fila.put_nowait((evento.id, evento.tipo, evento.dados))
+                        except queue.Full:
+                            # Cliente lento: perde o evento, mas pode retomar pelo Last-Event-ID
+                            pass
+            self._ultimo_id = eventos[-1].id
+
+    def _limpar(self):
+        limite = datetime.utcnow() - timedelta(hours=self.app.config['EVENTOS_RETENCAO_HORAS'])
+        # O evento mais recente nunca é apagado: sem AUTOINCREMENT o SQLite
+        # reutiliza ids a partir do maior existente, e um id repetido ficaria
+        # abaixo do `_ultimo_id` dos processos e do Last-Event-ID dos clientes
+        ultimo_id = db.session.query(db.func.max(EventoConta.id)).scalar()
+        if ultimo_id is None:
+            return
+        EventoConta.query.filter(
+            EventoConta.criado_em < limite, EventoConta.id < ultimo_id
+        ).delete(synchronize_session=False)
+        db.session.commit()
+
+
+eventos = Eventos()
@@ -0,0 +1,158 @@
+"""
+Fila assíncrona de transferências.
+
+As transferências assíncronas são gravadas como `Transacao` com status
+'pendente' — a própria tabela `transacoes` é o armazenamento durável da fila,
+então nada se perde em um reinício. Cada processo mantém uma fila local
+limitada e um pool de workers que liquidam as transações; quando a fila está
+cheia o endpoint recusa novas transferências (backpressure) em vez de acumular.
+"""
+
+import logging
+import os
+import queue
+import threading
+
+from sqlalchemy import update
+from src.models.financial import db, Conta, Transacao
+from src.services.eventos import eventos, registrar_eventos
+
+logger = logging.getLogger(__name__)
+
+
+class FilaCheia(Exception):
+    """A fila local de transferências atingiu a capacidade máxima"""
+
+
+def liquidar_transferencia(transacao_id):
+    """Liquidar uma transferência pendente, concluindo ou cancelando a transação"""
+    transacao = db.session.get(Transacao, transacao_id)
+    if transacao is None or transacao.status != 'pendente':
+        return None
+
+    conta_origem = db.session.get(Conta, transacao.conta_origem_id)
+    conta_destino = db.session.get(Conta, transacao.conta_destino_id)
+
+    novo_status = 'concluida'
+    if not conta_origem or not conta_destino:
+        novo_status = 'cancelada'
+    elif not conta_origem.ativo or not conta_destino.ativo:
+        novo_status = 'cancelada'
+
+    # Reivindica a transação: só segue se ela ainda estiver pendente, o que
+    # impede que dois workers (ou dois processos) liquidem a mesma transferência
+    resultado = db.session.execute(
+        update(Transacao)
+        .where(Transacao.id == transacao_id, Transacao.status == 'pendente')
+        .values(status=novo_status)
+    )
+    if resultado.rowcount != 1:
+        db.session.rollback()
+        return None
+
+    if novo_status == 'concluida':
+        if conta_origem.debitar(transacao.valor):
+            conta_destino.creditar(transacao.valor)
+        else:
+            transacao.status = 'cancelada'
+
+    registrar_eventos(transacao, conta_origem, conta_destino)
+    db.session.commit()
+    eventos.notificar()
+    return transacao
+
+
+class FilaTransferencias:
+    """Fila local limitada com pool de workers para liquidar transferências"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._fila = None
+        self._em_fila = set()
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('FILA_TRANSFERENCIAS_CAPACIDADE', int(os.environ.get('FILA_TRANSFERENCIAS_CAPACIDADE', 1000)))
+        app.config.setdefault('FILA_TRANSFERENCIAS_WORKERS', int(os.environ.get('FILA_TRANSFERENCIAS_WORKERS', 4)))
+        app.config.setdefault('FILA_TRANSFERENCIAS_VARREDURA_SEGUNDOS', 5)
+        self.app = app
+        app.extensions['fila_transferencias'] = self
+        # Os workers são iniciados no primeiro request de cada processo, assim
+        # continuam funcionando quando o gunicorn faz fork dos workers
+        app.before_request(self.iniciar)
+
+    def iniciar(self):
+        """Iniciar o pool de workers neste processo, caso ainda não exista"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._fila = queue.Queue(maxsize=self.app.config['FILA_TRANSFERENCIAS_CAPACIDADE'])
+            self._em_fila = set()
+            for i in range(self.app.config['FILA_TRANSFERENCIAS_WORKERS']):
+                worker = threading.Thread(target=self._executar, name=f'fila-transferencias-{i}', daemon=True)
+                worker.start()
+            self._pid = os.getpid()
+
+    def tem_capacidade(self):
+        self.iniciar()
+        return not self._fila.full()
+
+    def enfileirar(self, transacao_id):
+        """Colocar uma transação pendente na fila local"""
+        self.iniciar()
+        with self._lock:
+            if transacao_id in self._em_fila:
+                return
+            try:
+                self._fila.put_nowait(transacao_id)
+            except queue.Full:
+                raise FilaCheia('Fila de transferências cheia')
+            self._em_fila.add(transacao_id)
+
+    def _executar(self):
+        while True:
+            try:
+                transacao_id = self._fila.get(timeout=self.app.config['FILA_TRANSFERENCIAS_VARREDURA_SEGUNDOS'])
+            except queue.Empty:
+                self._varrer_pendentes()
+                continue
+
+            with self.app.app_context():
+                try:
+                    liquidar_transferencia(transacao_id)
+                except Exception:
+                    db.session.rollback()
+                    logger.exception('Erro ao liquidar transferência %s', transacao_id)
+            with self._lock:
+                self._em_fila.discard(transacao_id)
+            self._fila.task_done()
+
+    def _varrer_pendentes(self):
+        """Recolocar na fila transferências pendentes (reinícios, fila cheia, erros)"""
+        vagas = self._fila.maxsize - self._fila.qsize()
+        if vagas <= 0:
+            return
+        with self.app.app_context():
+            try:
+                ids = db.session.execute(
+                    db.select(Transacao.id)
+                    .where(Transacao.status == 'pendente', Transacao.tipo == 'transferencia')
+                    .order_by(Transacao.id)
+                    .limit(vagas)
+                ).scalars().all()
+            except Exception:
+                logger.exception('Erro ao buscar transferências pendentes')
+                return
+        for transacao_id in ids:
+            try:
+                self.enfileirar(transacao_id)
+            except FilaCheia:
+                break
+
+
+fila_transferencias = FilaTransferencias()
@@ -0,0 +1,209 @@
+"""
+Reconciliação do razão: confere se `Conta.saldo` bate com a soma das
+transações concluídas (créditos menos débitos) de cada conta, incluindo os
+totais dos meses já arquivados (`resumo_arquivo`).
+
+As contas são divididas em faixas de ID e cada faixa é agregada em SQL por um
+processo de um pool. Os valores são comparados em centavos inteiros para não
+depender de arredondamento de ponto flutuante do banco; no modo
+`DINHEIRO_EM_CENTAVOS` as colunas já são inteiras e as somas dispensam conversão.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import bindparam, create_engine, text
+from src.models.dinheiro import sql_centavos
+
+_engines = {}
+
+
+def _engine(database_url):
+    # Um engine por processo do pool, reaproveitado entre as partições
+    if database_url not in _engines:
+        _engines[database_url] = create_engine(database_url)
+    return _engines[database_url]
+
+
+def _iniciar_processo():
+    # Conexões herdadas pelo fork não podem ser usadas no processo filho:
+    # descarta os pools sem fechá-las, pois continuam sendo do processo pai
+    for engine in _engines.values():
+        engine.dispose(close=False)
+    _engines.clear()
+
+
+TAMANHO_LISTA_CONTAS = 500
+
+
+def _sql_particao(filtro):
+    """Agregado por conta; `filtro(coluna)` restringe as contas a uma faixa de IDs ou a uma lista"""
+    return f"""
+    SELECT c.id, c.numero_conta, {sql_centavos('c.saldo')} AS saldo,
+           COALESCE(e.total, 0) + COALESCE(a.entradas, 0) AS entradas,
+           COALESCE(s.total, 0) + COALESCE(a.saidas, 0) AS saidas
+    FROM contas c
+    LEFT JOIN (
+        SELECT conta_destino_id AS conta_id, SUM({sql_centavos('valor')}) AS total
+        FROM transacoes
+        WHERE status = 'concluida' AND {filtro('conta_destino_id')}
+        GROUP BY conta_destino_id
+    ) e ON e.conta_id = c.id
+    LEFT JOIN (
+        SELECT conta_origem_id AS conta_id, SUM({sql_centavos('valor')}) AS total
+        FROM transacoes
+        WHERE status = 'concluida' AND {filtro('conta_origem_id')}
+        GROUP BY conta_origem_id
+    ) s ON s.conta_id = c.id
+    LEFT JOIN (
+        SELECT conta_id, SUM(entradas_centavos) AS entradas, SUM(saidas_centavos) AS saidas
+        FROM resumo_arquivo
+        WHERE {filtro('conta_id')}
+        GROUP BY conta_id
+    ) a ON a.conta_id = c.id
+    WHERE {filtro('c.id')}
+"""
+
+
+SQL_PARTICAO = text(_sql_particao(lambda coluna: f'{coluna} BETWEEN :inicio AND :fim'))
+# Execução incremental: só as contas tocadas, para não agregar a faixa inteira
+SQL_CONTAS = text(_sql_particao(lambda coluna: f'{coluna} IN :contas')).bindparams(
+    bindparam('contas', expanding=True)
+)
+
+SQL_JANELA = """
+    SELECT MIN(id), MAX(id), MIN(data_transacao), MAX(data_transacao), COUNT(*)
+    FROM transacoes
+    WHERE (conta_origem_id = :conta_id OR conta_destino_id = :conta_id) AND id > :desde
+"""
+
+
+def reconciliar_particao(database_url, inicio, fim, contas=None, desde_transacao_id=0):
+    """Agregar uma faixa de contas e devolver (contas verificadas, divergências)"""
+    divergencias = []
+    verificadas = 0
+
+    with _engine(database_url).connect() as conexao:
+        if contas is None:
+            linhas = conexao.execute(SQL_PARTICAO, {'inicio': inicio, 'fim': fim}).all()
+        else:
+            linhas = []
+            for posicao in range(0, len(contas), TAMANHO_LISTA_CONTAS):
+                lista = contas[posicao:posicao + TAMANHO_LISTA_CONTAS]
+                linhas.extend(conexao.execute(SQL_CONTAS, {'contas': lista}).all())
+        for conta_id, numero_conta, saldo, entradas, saidas in linhas:
+            verificadas += 1
+            saldo_calculado = entradas - saidas
+            if saldo == saldo_calculado:
+                continue
+
+            # Janela de transações que pode conter a origem da divergência
+            primeira_id, ultima_id, inicio_janela, fim_janela, quantidade = conexao.execute(
+                text(SQL_JANELA), {'conta_id': conta_id, 'desde': desde_transacao_id}
+            ).one()
+            divergencias.append({
+                'conta_id': conta_id,
+                'numero_conta': numero_conta,
+                'saldo': saldo / 100,
+                'saldo_calculado': saldo_calculado / 100,
+                'diferenca': (saldo - saldo_calculado) / 100,
+                'janela': {
+                    'primeira_transacao_id': primeira_id,
+                    'ultima_transacao_id': ultima_id,
+                    'inicio': str(inicio_janela) if inicio_janela else None,
+                    'fim': str(fim_janela) if fim_janela else None,
+                    'transacoes': quantidade
+                }
+            })
+
+    return verificadas, divergencias
+
+
+def _marca_d_agua(conexao):
+    """Maior ID de transação já estável: transações pendentes ainda podem mudar de status"""
+    ultima_transacao_id = conexao.execute(text('SELECT COALESCE(MAX(id), 0) FROM transacoes')).scalar()
+    menor_pendente = conexao.execute(
+        text("SELECT MIN(id) FROM transacoes WHERE status = 'pendente'")
+    ).scalar()
+    if menor_pendente is not None:
+        ultima_transacao_id = min(ultima_transacao_id, menor_pendente - 1)
+    return ultima_transacao_id
+
+
+def _contas_tocadas(conexao, desde_transacao_id, desde_conta_id):
+    """Contas com transações ou criadas depois do último checkpoint"""
+    resultado = conexao.execute(text("""
+        SELECT conta_origem_id FROM transacoes WHERE id > :transacao AND conta_origem_id IS NOT NULL
+        UNION
+        SELECT conta_destino_id FROM transacoes WHERE id > :transacao AND conta_destino_id IS NOT NULL
+        UNION
+        SELECT id FROM contas WHERE id > :conta
+    """), {'transacao': desde_transacao_id, 'conta': desde_conta_id})
+    return sorted(linha[0] for linha in resultado)
+
+
+def executar_reconciliacao(database_url, checkpoint=None, tamanho_particao=50000, processos=None):
+    """
+    Reconciliar todas as contas, ou só as tocadas desde `checkpoint` (execução
+    incremental). Devolve um dicionário com o relatório e os dados do novo
+    checkpoint.
+
+    A execução incremental depende de os IDs de transação só crescerem. Se o
+    maior ID atual for menor que o do checkpoint, IDs podem ter sido
+    reaproveitados e a execução passa a ser completa.
+    """
+    inicio_execucao = datetime.utcnow()
+    # Engine próprio do processo pai, descartado antes de criar o pool de processos
+    engine = create_engine(database_url)
+    with engine.connect() as conexao:
+        ultima_transacao_id = _marca_d_agua(conexao)
+        ultima_conta_id = conexao.execute(text('SELECT COALESCE(MAX(id), 0) FROM contas')).scalar()
+        menor_conta_id = conexao.execute(text('SELECT COALESCE(MIN(id), 0) FROM contas')).scalar()
+
+        maior_transacao_id = conexao.execute(text('SELECT COALESCE(MAX(id), 0) FROM transacoes')).scalar()
+        if checkpoint is not None and checkpoint.ultima_transacao_id > maior_transacao_id:
+            checkpoint = None
+
+        if checkpoint is not None:
+            desde_transacao_id = checkpoint.ultima_transacao_id
+            contas = _contas_tocadas(conexao, desde_transacao_id, checkpoint.ultima_conta_id)
+        else:
+            desde_transacao_id = 0
+            contas = None
+    engine.dispose()
+
+    # Monta as partições por faixa de ID; na execução incremental só entram as
+    # faixas que têm contas tocadas
+    particoes = []
+    if contas is None:
+        for inicio in range(menor_conta_id, ultima_conta_id + 1, tamanho_particao):
+            particoes.append((inicio, inicio + tamanho_particao - 1, None))
+    else:
+        faixas = {}
+        for conta_id in contas:
+            faixas.setdefault(conta_id // tamanho_particao, []).append(conta_id)
+        for faixa, ids in sorted(faixas.items()):
+            particoes.append((faixa * tamanho_particao, (faixa + 1) * tamanho_particao - 1, ids))
+
+    verificadas = 0
+    divergencias = []
+    if particoes:
+        with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo) as pool:
+            futuros = [
+                pool.submit(reconciliar_particao, database_url, inicio, fim, ids, desde_transacao_id)
+                for inicio, fim, ids in particoes
+            ]
+            for futuro in futuros:
+                verificadas_particao, divergencias_particao = futuro.result()
+                verificadas += verificadas_particao
+                divergencias.extend(divergencias_particao)
+
+    return {
+        'incremental': checkpoint is not None,
+        'particoes': len(particoes),
+        'contas_verificadas': verificadas,
+        'divergencias': sorted(divergencias, key=lambda d: d['conta_id']),
+        'ultima_transacao_id': ultima_transacao_id,
+        'ultima_conta_id': ultima_conta_id,
+        'duracao_segundos': (datetime.utcnow() - inicio_execucao).total_seconds()
+    }
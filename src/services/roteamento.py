@@ -0,0 +1,87 @@
+"""
+Roteamento de leitura e escrita entre o banco primário e o pool de leitura.
+
+As rotas GET de consulta são marcadas como somente leitura e a
+`SessaoRoteada` manda as suas consultas para o engine `leitura` (SQLite aberto
+com `mode=ro` ou uma réplica em `DATABASE_READ_URL`). Transferências, depósitos
+e cadastros continuam no primário.
+
+Leia-suas-escritas: depois de uma escrita bem-sucedida o cliente recebe um
+cookie que, por `LEITURA_APOS_ESCRITA_SEGUNDOS`, faz as suas leituras irem ao
+primário — assim ele vê a própria transferência mesmo com réplica atrasada. O
+cabeçalho `X-Consistencia: forte` tem o mesmo efeito em uma requisição avulsa.
+"""
+
+import os
+import time
+
+from flask import g, request
+
+ENDPOINTS_LEITURA = {
+    'financial.listar_contas',
+    'financial.obter_conta',
+    'financial.obter_extrato',
+    'financial.obter_transacao',
+    'financial.eventos_conta',
+    'user.get_users',
+    'user.get_user',
+    'user.export_users',
+}
+COOKIE_PRIMARIO = 'ler_primario_ate'
+
+
+def url_leitura(database_url):
+    """URL somente leitura padrão: o mesmo arquivo SQLite aberto com mode=ro"""
+    prefixo = 'sqlite:///'
+    if not database_url.startswith(prefixo) or database_url == prefixo:
+        return None
+    caminho = database_url[len(prefixo):]
+    if caminho.startswith('file:') or caminho == ':memory:':
+        return None
+    return f'{prefixo}file:{caminho}?mode=ro&uri=true'
+
+
+class Roteamento:
+    """Marca as requisições somente leitura e controla o leia-suas-escritas"""
+
+    def __init__(self, app=None):
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('LEITURA_APOS_ESCRITA_SEGUNDOS', int(os.environ.get('LEITURA_APOS_ESCRITA_SEGUNDOS', 5)))
+        self.app = app
+        app.extensions['roteamento'] = self
+        app.before_request(self.marcar)
+        app.after_request(self.registrar_escrita)
+
+    def _ler_do_primario(self):
+        if request.headers.get('X-Consistencia', '').lower() == 'forte':
+            return True
+        try:
+            return float(request.cookies.get(COOKIE_PRIMARIO, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def marcar(self):
+        g.somente_leitura = (
+            request.method in ('GET', 'HEAD')
+            and request.endpoint in ENDPOINTS_LEITURA
+            and not self._ler_do_primario()
+        )
+
+    def registrar_escrita(self, resposta):
+        janela = self.app.config['LEITURA_APOS_ESCRITA_SEGUNDOS']
+        if (
+            janela > 0
+            and request.method in ('POST', 'PUT', 'PATCH', 'DELETE')
+            and request.path.startswith('/api/')
+            and 200 <= resposta.status_code < 300
+        ):
+            resposta.set_cookie(COOKIE_PRIMARIO, f'{time.time() + janela:.3f}', max_age=janela,
+                                httponly=True, samesite='Lax')
+        return resposta
+
+
+roteamento = Roteamento()
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Teste de estresse do caminho de transferências e depósitos
+
+Cria um banco temporário com contas de saldo inicial conhecido, sobe a
+aplicação no gunicorn com vários workers e threads e dispara transferências e
+depósitos aleatórios e concorrentes, com parte delas concentrada em poucas
+contas "quentes" para forçar conflitos. No final confere que:
+
+- o dinheiro foi conservado (soma dos saldos = saldos iniciais + depósitos);
+- nenhuma conta ficou com saldo negativo;
+- todo saldo bate com o razão de transações (reconciliação completa);
+- toda operação confirmada ao cliente está gravada no banco;
+- arquivar o mês não remove a transação de maior ID nem desfaz a reconciliação.
+
+Relata a vazão sustentada, a latência e a taxa de erros de trava do SQLite.
+Sai com código 1 se alguma verificação falhar.
+
+Uso:
+    python stress_transferencias.py
+    python stress_transferencias.py --workers 4 --threads 8 --clientes 64 --duracao 60
+    python stress_transferencias.py --contas 1000 --quentes 3 --proporcao-quentes 0.7 --assincronas 0.2
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import json
+import random
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+from decimal import Decimal
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def preparar_ambiente(diretorio):
+    """Variáveis de ambiente que isolam a aplicação no diretório temporário"""
+    ambiente = dict(os.environ)
+    ambiente.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(diretorio, 'stress.db')}",
+        'ARQUIVO_TRANSACOES_DIR': os.path.join(diretorio, 'arquivo'),
+        'ADMISSAO_DB': os.path.join(diretorio, 'admissao.db'),
+        # O objetivo é medir o caminho de escrita, não o limitador de taxa
+        'ADMISSAO_HABILITADA': '0',
+        'LEITURA_APOS_ESCRITA_SEGUNDOS': '0',
+        'PYTHONPATH': RAIZ,
+    })
+    return ambiente
+
+
+def popular(quantidade, saldo_inicial):
+    """Criar as contas com o saldo inicial registrado como depósito"""
+    from sqlalchemy import insert
+    from src.models.user import db
+    from src.models.financial import Conta, Transacao
+    from src.main import app
+
+    with app.app_context():
+        db.session.execute(insert(Conta), [
+            {
+                'numero_conta': f'{i:06d}',
+                'titular': f'Conta de estresse {i}',
+                'cpf': f'{i:011d}',
+                'saldo': saldo_inicial
+            }
+            for i in range(1, quantidade + 1)
+        ])
+        ids = [conta_id for (conta_id,) in db.session.query(Conta.id).order_by(Conta.id)]
+        db.session.execute(insert(Transacao), [
+            {
+                'codigo_unico': str(uuid.uuid4()),
+                'conta_destino_id': conta_id,
+                'tipo': 'deposito',
+                'valor': saldo_inicial,
+                'descricao': 'Saldo inicial',
+                'status': 'concluida'
+            }
+            for conta_id in ids
+        ])
+        db.session.commit()
+    return ids
+
+
+def iniciar_gunicorn(ambiente, porta, workers, threads, log):
+    processo = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(workers), '--threads', str(threads),
+         '-b', f'127.0.0.1:{porta}', '--timeout', '120', 'src.main:app'],
+        cwd=RAIZ, env=ambiente, stdout=log, stderr=subprocess.STDOUT
+    )
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f'gunicorn terminou com código {processo.returncode}')
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{porta}/api/contas/1', timeout=2).read()
+            return processo
+        except OSError:
+            time.sleep(0.2)
+    processo.terminate()
+    raise RuntimeError('gunicorn não respondeu em 30 segundos')
+
+
+class Cliente(threading.Thread):
+    """Thread que dispara operações aleatórias até o fim do prazo"""
+
+    def __init__(self, base, ids, quentes, args, prazo, semente):
+        super().__init__(daemon=True)
+        self.base = base
+        self.ids = ids
+        self.quentes = quentes
+        self.args = args
+        self.prazo = prazo
+        self.aleatorio = random.Random(semente)
+        self.status = Counter()
+        self.erros_trava = 0
+        self.latencias = []
+        # Operações confirmadas ao cliente: (tipo, status HTTP, código da transação, valor)
+        self.confirmadas = []
+
+    def _conta(self):
+        if self.aleatorio.random() < self.args.proporcao_quentes:
+            return self.aleatorio.choice(self.quentes)
+        return self.aleatorio.choice(self.ids)
+
+    def _enviar(self, caminho, corpo):
+        requisicao = urllib.request.Request(
+            self.base + caminho, data=json.dumps(corpo).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}
+        )
+        inicio = time.perf_counter()
+        try:
+            with urllib.request.urlopen(requisicao, timeout=60) as resposta:
+                codigo, dados = resposta.status, json.loads(resposta.read())
+        except urllib.error.HTTPError as erro:
+            codigo = erro.code
+            try:
+                dados = json.loads(erro.read())
+            except ValueError:
+                dados = {}
+        except OSError:
+            codigo, dados = 'conexao', {}
+        self.latencias.append(time.perf_counter() - inicio)
+        return codigo, dados
+
+    def run(self):
+        while time.monotonic() < self.prazo:
+            valor = Decimal(self.aleatorio.randint(1, self.args.valor_maximo * 100)) / 100
+            if self.aleatorio.random() < self.args.depositos:
+                tipo = 'deposito'
+                codigo, dados = self._enviar('/api/deposito', {'conta_id': self._conta(), 'valor': str(valor)})
+            else:
+                tipo = 'transferencia'
+                origem = self._conta()
+                destino = self._conta()
+                while destino == origem:
+                    destino = self.aleatorio.choice(self.ids)
+                corpo = {'conta_origem_id': origem, 'conta_destino_id': destino, 'valor': str(valor)}
+                if self.aleatorio.random() < self.args.assincronas:
+                    corpo['assincrono'] = True
+                codigo, dados = self._enviar('/api/transferencia', corpo)
+
+            self.status[f'{tipo} {codigo}'] += 1
+            if codigo == 500 and 'locked' in dados.get('erro', ''):
+                self.erros_trava += 1
+            if codigo in (200, 202):
+                self.confirmadas.append((tipo, codigo, dados['codigo_transacao'], valor))
+
+
+def aguardar_pendentes(ambiente, limite_segundos=60):
+    """Esperar a fila assíncrona liquidar as transferências pendentes"""
+    from sqlalchemy import create_engine, text
+    engine = create_engine(ambiente['DATABASE_URL'])
+    limite = time.monotonic() + limite_segundos
+    with engine.connect() as conexao:
+        while True:
+            pendentes = conexao.execute(text("SELECT COUNT(*) FROM transacoes WHERE status = 'pendente'")).scalar()
+            if pendentes == 0 or time.monotonic() > limite:
+                return pendentes
+            time.sleep(0.5)
+
+
+def verificar(ambiente, quantidade, saldo_inicial, confirmadas):
+    """Conferir as invariantes no banco; devolve a lista de falhas"""
+    from sqlalchemy import create_engine, text
+    from src.models.dinheiro import sql_centavos
+    from src.services.reconciliacao import executar_reconciliacao
+
+    falhas = []
+    engine = create_engine(ambiente['DATABASE_URL'])
+    with engine.connect() as conexao:
+        total = conexao.execute(text(f"SELECT SUM({sql_centavos('saldo')}) FROM contas")).scalar() or 0
+        depositos = conexao.execute(text(
+            f"SELECT COALESCE(SUM({sql_centavos('valor')}), 0) FROM transacoes "
+            "WHERE tipo = 'deposito' AND status = 'concluida'"
+        )).scalar()
+        esperado_inicial = int(saldo_inicial * 100) * quantidade
+        print(f"Soma dos saldos:        {total / 100:,.2f}")
+        print(f"Iniciais + depósitos:   {depositos / 100:,.2f}")
+        if total != depositos:
+            falhas.append(f'dinheiro não conservado: diferença de {(total - depositos) / 100:,.2f}')
+
+        confirmados = sum(int(valor * 100) for tipo, _, _, valor in confirmadas if tipo == 'deposito')
+        if depositos - esperado_inicial != confirmados:
+            falhas.append(f'depósitos gravados ({(depositos - esperado_inicial) / 100:,.2f}) diferem dos '
+                          f'confirmados ao cliente ({confirmados / 100:,.2f})')
+
+        negativas = conexao.execute(text('SELECT COUNT(*) FROM contas WHERE saldo < 0')).scalar()
+        if negativas:
+            falhas.append(f'{negativas} conta(s) com saldo negativo')
+
+        # Toda operação confirmada precisa estar no razão: síncronas concluídas,
+        # assíncronas liquidadas (concluídas ou canceladas por saldo)
+        status = dict(conexao.execute(text('SELECT codigo_unico, status FROM transacoes')).all())
+        perdidas = 0
+        for _, codigo_http, codigo_unico, _ in confirmadas:
+            esperado = ('concluida', 'cancelada') if codigo_http == 202 else ('concluida',)
+            if status.get(codigo_unico) not in esperado:
+                perdidas += 1
+        if perdidas:
+            falhas.append(f'{perdidas} operação(ões) confirmada(s) ausente(s) ou com status errado no razão')
+
+    resultado = executar_reconciliacao(ambiente['DATABASE_URL'], processos=2)
+    print(f"Reconciliação:          {resultado['contas_verificadas']} contas, "
+          f"{len(resultado['divergencias'])} divergência(s)")
+    for divergencia in resultado['divergencias'][:10]:
+        print(f"  conta {divergencia['numero_conta']}: saldo {divergencia['saldo']:,.2f}, "
+              f"razão {divergencia['saldo_calculado']:,.2f}")
+    if resultado['divergencias']:
+        falhas.append(f"{len(resultado['divergencias'])} conta(s) com saldo diferente do razão")
+    return falhas
+
+
+def verificar_arquivamento(ambiente):
+    """
+    Arquivar o mês corrente e conferir que o maior ID de transação não volta a
+    ser entregue e que o razão continua reconciliado com os totais arquivados
+    """
+    from datetime import datetime
+    from sqlalchemy import create_engine, text
+    from src.main import app
+    from src.services.arquivo_transacoes import arquivo_transacoes
+    from src.services.reconciliacao import executar_reconciliacao
+
+    falhas = []
+    engine = create_engine(ambiente['DATABASE_URL'])
+    with engine.connect() as conexao:
+        maior_antes = conexao.execute(text('SELECT MAX(id) FROM transacoes')).scalar()
+    with app.app_context():
+        movidas = arquivo_transacoes.arquivar_mes(datetime.utcnow())
+    with engine.connect() as conexao:
+        maior_depois = conexao.execute(text('SELECT MAX(id) FROM transacoes')).scalar()
+    print(f"Arquivamento:           {movidas} transações arquivadas, maior ID {maior_antes} -> {maior_depois}")
+    if maior_depois != maior_antes:
+        falhas.append(f'o arquivamento removeu a transação de maior ID ({maior_antes}); IDs seriam reaproveitados')
+
+    resultado = executar_reconciliacao(ambiente['DATABASE_URL'], processos=2)
+    if resultado['divergencias']:
+        falhas.append(f"{len(resultado['divergencias'])} conta(s) divergente(s) depois do arquivamento")
+    return falhas
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de estresse de transferências concorrentes')
+    parser.add_argument('--workers', type=int, default=4, help='workers do gunicorn')
+    parser.add_argument('--threads', type=int, default=4, help='threads por worker do gunicorn')
+    parser.add_argument('--clientes', type=int, default=32, help='clientes HTTP concorrentes')
+    parser.add_argument('--duracao', type=float, default=30, help='duração da carga em segundos')
+    parser.add_argument('--contas', type=int, default=200)
+    parser.add_argument('--saldo-inicial', type=Decimal, default=Decimal('1000.00'))
+    parser.add_argument('--quentes', type=int, default=5, help='contas disputadas pela maior parte da carga')
+    parser.add_argument('--proporcao-quentes', type=float, default=0.5,
+                        help='probabilidade de cada ponta da operação cair em uma conta quente')
+    parser.add_argument('--depositos', type=float, default=0.2, help='proporção de depósitos')
+    parser.add_argument('--assincronas', type=float, default=0.0, help='proporção de transferências assíncronas')
+    parser.add_argument('--valor-maximo', type=int, default=200)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--manter', action='store_true', help='não apagar o diretório temporário no final')
+    args = parser.parse_args()
+
+    diretorio = tempfile.mkdtemp(prefix='stress_techmarket_')
+    ambiente = preparar_ambiente(diretorio)
+    os.environ.update(ambiente)
+    processo = None
+    try:
+        print(f"Populando {args.contas} contas em {diretorio}...")
+        ids = popular(args.contas, args.saldo_inicial)
+        quentes = ids[:args.quentes]
+
+        porta = _porta_livre()
+        with open(os.path.join(diretorio, 'gunicorn.log'), 'w') as log:
+            processo = iniciar_gunicorn(ambiente, porta, args.workers, args.threads, log)
+            print(f"gunicorn: {args.workers} workers x {args.threads} threads; "
+                  f"{args.clientes} clientes por {args.duracao:.0f}s...")
+
+            prazo = time.monotonic() + args.duracao
+            inicio = time.perf_counter()
+            clientes = [
+                Cliente(f'http://127.0.0.1:{porta}', ids, quentes, args, prazo, args.semente + i)
+                for i in range(args.clientes)
+            ]
+            for cliente in clientes:
+                cliente.start()
+            for cliente in clientes:
+                cliente.join()
+            decorrido = time.perf_counter() - inicio
+
+            pendentes = aguardar_pendentes(ambiente)
+            processo.terminate()
+            processo.wait(timeout=30)
+            processo = None
+
+        status = Counter()
+        latencias = []
+        confirmadas = []
+        for cliente in clientes:
+            status.update(cliente.status)
+            latencias.extend(cliente.latencias)
+            confirmadas.extend(cliente.confirmadas)
+        erros_trava = sum(cliente.erros_trava for cliente in clientes)
+        total = sum(status.values())
+        latencias.sort()
+
+        print("\nRespostas:")
+        for chave, quantidade in sorted(status.items()):
+            print(f"  {chave:<24} {quantidade:>8}")
+        print(f"\nRequisições:            {total} em {decorrido:.1f}s ({total / decorrido:,.1f}/s)")
+        print(f"Operações confirmadas:  {len(confirmadas)} ({len(confirmadas) / decorrido:,.1f}/s)")
+        print(f"Erros de trava:         {erros_trava} ({erros_trava / max(total, 1):.2%})")
+        print(f"Latência (ms):          p50 {_percentil(latencias, 0.5) * 1000:.1f}  "
+              f"p95 {_percentil(latencias, 0.95) * 1000:.1f}  p99 {_percentil(latencias, 0.99) * 1000:.1f}")
+        print()
+
+        falhas = verificar(ambiente, args.contas, args.saldo_inicial, confirmadas)
+        falhas.extend(verificar_arquivamento(ambiente))
+        if pendentes:
+            falhas.append(f'{pendentes} transferência(s) ainda pendente(s) após a carga')
+
+        if falhas:
+            print("\nFALHOU:")
+            for falha in falhas:
+                print(f"  - {falha}")
+            print(f"(banco e log do gunicorn mantidos em {diretorio})")
+            args.manter = True
+            sys.exit(1)
+        print("\nOK: dinheiro conservado, nenhum saldo negativo e razão reconciliado, inclusive após o arquivamento")
+    finally:
+        if processo is not None:
+            processo.terminate()
+        if not args.manter:
+            shutil.rmtree(diretorio, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()